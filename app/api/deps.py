@@ -0,0 +1,58 @@
+from contextvars import ContextVar
+from typing import Annotated, Any, AsyncIterator
+from uuid import UUID
+
+from fastapi import Cookie, HTTPException, status
+from jose import JWTError
+
+from app.core.admission import AdmissionRejected, get_password_hash_limiter
+from app.core.config import get_settings
+from app.core.metrics import ADMISSION_REJECTED
+from app.core.security import verify_access_token
+
+# Token subject of the request being served, for code that records who acted.
+current_subject: ContextVar[str | None] = ContextVar("current_subject", default=None)
+# Project of the logged-in user; leases taken by the request count against it.
+current_project: ContextVar[UUID | None] = ContextVar("current_project", default=None)
+
+
+async def get_token_claims(
+    access_token: Annotated[str | None, Cookie()] = None,
+) -> dict[str, Any]:
+    if access_token is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+        )
+
+    try:
+        claims = verify_access_token(access_token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired token",
+        )
+
+    current_subject.set(claims.get("sub"))
+    # Tokens issued before the claim existed lease without a quota.
+    project = claims.get("project")
+    current_project.set(UUID(project) if project else None)
+    return claims
+
+
+async def admit_password_hashing() -> AsyncIterator[None]:
+    limiter = get_password_hash_limiter()
+    try:
+        await limiter.acquire()
+    except AdmissionRejected as exc:
+        ADMISSION_REJECTED.labels("password_hash", exc.reason).inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, retry later",
+            headers={"Retry-After": str(get_settings().PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+        )
+
+    try:
+        yield
+    finally:
+        limiter.release()
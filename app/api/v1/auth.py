@@ -3,15 +3,17 @@ from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import admit_password_hashing
 from app.core.database import get_db_session
-from app.core.security import verify_password, create_jwt_token
+from app.core.metrics import LOGIN_ATTEMPTS
+from app.core.security import verify_password_cached, create_jwt_token
 from app.schemas.auth import LoginRequest
 from app.services.user_dao import UserDAO
 
 router = APIRouter(prefix="/api/v1/auth", tags=["auth-v1"])
 
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(admit_password_hashing, scope="function")])
 async def login_v1(
     payload: LoginRequest,
     response: Response,
@@ -20,15 +22,20 @@ async def login_v1(
     dao = UserDAO(db)
     user = await dao.find_one(login=payload.login)
 
-    if user is None or not verify_password(payload.password, user.password):
+    if user is None or not await verify_password_cached(
+        payload.login, payload.password, user.password
+    ):
+        LOGIN_ATTEMPTS.labels("failure").inc()
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect login or password",
         )
 
+    LOGIN_ATTEMPTS.labels("success").inc()
+
     access_token_expires = timedelta(minutes=30)
     access_token = create_jwt_token(
-        data={"sub": str(user.id), "ver": "v1"},
+        data={"sub": str(user.id), "ver": "v1", "project": str(user.project_id)},
         expires_delta=access_token_expires,
         token_type="access",
     )
@@ -0,0 +1,19 @@
+import os
+
+from fastapi import APIRouter
+
+from app.core.admission import get_password_hash_limiter
+from app.core.database import engine, get_pool_stats
+from app.schemas.internal import AdmissionStats, PoolStats
+
+router = APIRouter(prefix="/api/v1/internal", tags=["internal"])
+
+
+@router.get("/pool", response_model=PoolStats)
+async def get_pool():
+    return {**get_pool_stats(engine), "worker_pid": os.getpid()}
+
+
+@router.get("/admission", response_model=AdmissionStats)
+async def get_admission():
+    return {**get_password_hash_limiter().stats(), "worker_pid": os.getpid()}
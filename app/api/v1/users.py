@@ -1,30 +1,162 @@
+from typing import Annotated, AsyncIterator, NoReturn
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.user import UserCreate, UserRead
-from app.services.user_dao import UserDAO
-from app.core.database import get_db_session
-from app.core.security import get_password_hash
+from app.api.deps import (
+    admit_password_hashing,
+    current_project,
+    current_subject,
+    get_token_claims,
+)
+from app.schemas.user import (
+    UserBatchLockResult,
+    UserClaimBatch,
+    UserClaimBatchResult,
+    UserClaimQuery,
+    UserCreate,
+    UserExportQuery,
+    UserIds,
+    UserImportResult,
+    UserPage,
+    UserPageQuery,
+    UserRead,
+    MAX_LOCK_WAIT_SECONDS,
+    user_page_adapter,
+)
+from app.services.lease_audit import lease_audit
+from app.services.lock_backends import LockBackend, get_lock_backend, may_change_lease
+from app.services.lock_notifier import lock_notifier
+from app.services.user_dao import LeaseQuotaExceeded, UserDAO
+from app.services.user_import import (
+    ImportFormat,
+    import_user_rows,
+    iter_lines,
+    parse_user_rows,
+)
+from app.core.config import get_settings
+from app.core.database import get_db_session, get_unit_of_work_session
+from app.core.metrics import LOCK_OPERATIONS
+from app.core.pagination import decode_cursor, encode_cursor
+from app.core.security import get_password_hash_async
 
-router = APIRouter(prefix="/api/v1/users", tags=["users"])
+router = APIRouter(
+    prefix="/api/v1/users",
+    tags=["users"],
+    dependencies=[Depends(get_token_claims)],
+)
 
 
-@router.get("/", response_model=list[UserRead])
-async def get_users(db: AsyncSession = Depends(get_db_session)):
+def _audit(db: AsyncSession, action: str, *users) -> None:
+    lease_audit.record_after_commit(
+        db, action, [user.id for user in users], current_subject.get()
+    )
+
+
+def _quota_exceeded(operation: str) -> NoReturn:
+    LOCK_OPERATIONS.labels(operation, "quota_exceeded").inc()
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Project lease quota exceeded",
+    )
+
+
+def _check_holder(operation: str, backend: LockBackend, user) -> None:
+    if not may_change_lease(backend.holder(user), current_project.get()):
+        LOCK_OPERATIONS.labels(operation, "forbidden").inc()
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User is leased by another project",
+        )
+
+
+async def _get_user(dao: UserDAO, user_id: UUID, project_id: UUID | None):
+    # With the project_id the lookup reads one partition instead of all.
+    filter_by = {} if project_id is None else {"project_id": project_id}
+    return await dao.get_by_id(user_id, primary=True, **filter_by)
+
+
+def _batch_lock_result(
+    db: AsyncSession, operation: str, requested_ids, users
+) -> UserBatchLockResult:
+    _audit(db, operation, *users)
+    done_ids = {user.id for user in users}
+    failed = [user_id for user_id in dict.fromkeys(requested_ids) if user_id not in done_ids]
+    LOCK_OPERATIONS.labels(operation, "success").inc(len(users))
+    LOCK_OPERATIONS.labels(operation, "conflict").inc(len(failed))
+    return UserBatchLockResult(users=users, failed=failed)
+
+
+async def _ndjson_chunks(partitions) -> AsyncIterator[bytes]:
+    async for users in partitions:
+        yield "".join(
+            UserRead.model_validate(user).model_dump_json() + "\n" for user in users
+        ).encode()
+
+
+@router.get("/", response_model=UserPage)
+async def get_users(
+    query: Annotated[UserPageQuery, Query()],
+    db: AsyncSession = Depends(get_db_session),
+):
+    if query.locked is not None and not get_lock_backend().stores_locktime:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="The locked filter needs LOCK_BACKEND=locktime",
+        )
+
+    after = None
+    if query.cursor is not None:
+        try:
+            after = decode_cursor(query.cursor)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+
+    dao = UserDAO(db)
+    rows = await dao.find_page_rows(
+        query.limit + 1, after, locked=query.locked, **query.filter_by()
+    )
+
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[: query.limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    return Response(
+        user_page_adapter.dump_json({"items": rows, "next_cursor": next_cursor}),
+        media_type="application/json",
+    )
+
+
+@router.get("/export")
+async def export_users(
+    query: Annotated[UserExportQuery, Query()],
+    db: AsyncSession = Depends(get_db_session),
+):
     dao = UserDAO(db)
-    users = await dao.find_all()
-    return users
+    partitions = dao.stream_partitions(
+        query.yield_per or get_settings().EXPORT_YIELD_PER, **query.filter_by()
+    )
+    return StreamingResponse(_ndjson_chunks(partitions), media_type="application/x-ndjson")
 
 
-@router.post("/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/",
+    response_model=UserRead,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(admit_password_hashing, scope="function")],
+)
 async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db_session)):
     dao = UserDAO(db)
 
     data = user_in.model_dump()
-    data["password"] = get_password_hash(user_in.password)
+    data["password"] = await get_password_hash_async(user_in.password)
 
     try:
         user = await dao.create(data)
@@ -38,49 +170,181 @@ async def create_user(user_in: UserCreate, db: AsyncSession = Depends(get_db_ses
     return user
 
 
+@router.post("/import", response_model=UserImportResult)
+async def import_users(
+    request: Request,
+    fmt: Annotated[ImportFormat, Query(alias="format")] = "jsonl",
+    db: AsyncSession = Depends(get_db_session),
+):
+    rows = parse_user_rows(iter_lines(request.stream()), fmt)
+    return await import_user_rows(db, rows, get_settings().IMPORT_CHUNK_SIZE)
+
+
+@router.post("/claim", response_model=UserRead)
+async def claim_user(
+    query: Annotated[UserClaimQuery, Query()],
+    db: AsyncSession = Depends(get_db_session),
+):
+    dao = UserDAO(db)
+    filter_by = query.filter_by()
+
+    backend = get_lock_backend()
+    lessee = current_project.get()
+
+    try:
+        user = await lock_notifier.acquire_with_wait(
+            lambda: backend.claim(dao, lessee, **filter_by), query.wait, lessee, **filter_by
+        )
+    except LeaseQuotaExceeded:
+        _quota_exceeded("claim")
+    if user is None:
+        LOCK_OPERATIONS.labels("claim", "conflict").inc()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="No free user available",
+        )
+
+    LOCK_OPERATIONS.labels("claim", "success").inc()
+    _audit(db, "claim", user)
+    return user
+
+
+@router.post("/claim/batch", response_model=UserClaimBatchResult)
+async def claim_users(
+    payload: UserClaimBatch,
+    db: AsyncSession = Depends(get_unit_of_work_session, scope="function"),
+):
+    dao = UserDAO(db)
+    users = await get_lock_backend().claim_many(
+        dao, payload.count, current_project.get(), **payload.filter_by()
+    )
+    LOCK_OPERATIONS.labels("claim", "success").inc(len(users))
+    _audit(db, "claim", *users)
+    LOCK_OPERATIONS.labels("claim", "conflict").inc(payload.count - len(users))
+    return UserClaimBatchResult(users=users, requested=payload.count)
+
+
+@router.post("/acquire-lock/batch", response_model=UserBatchLockResult)
+async def acquire_locks(
+    payload: UserIds,
+    db: AsyncSession = Depends(get_unit_of_work_session, scope="function"),
+):
+    dao = UserDAO(db)
+    users = await get_lock_backend().acquire_many(dao, payload.ids, current_project.get())
+    return _batch_lock_result(db, "acquire", payload.ids, users)
+
+
+@router.post("/release-lock/batch", response_model=UserBatchLockResult)
+async def release_locks(
+    payload: UserIds,
+    db: AsyncSession = Depends(get_unit_of_work_session, scope="function"),
+):
+    dao = UserDAO(db)
+    users = await get_lock_backend().release_many(dao, payload.ids, current_project.get())
+    return _batch_lock_result(db, "release", payload.ids, users)
+
+
 @router.post("/{user_id}/acquire-lock", response_model=UserRead)
-async def acquire_lock(user_id: UUID, db: AsyncSession = Depends(get_db_session)):
+async def acquire_lock(
+    user_id: UUID,
+    wait: Annotated[float, Query(ge=0, le=MAX_LOCK_WAIT_SECONDS)] = 0,
+    project_id: Annotated[UUID | None, Query()] = None,
+    db: AsyncSession = Depends(get_db_session),
+):
     dao = UserDAO(db)
 
-    user = await dao.get_by_id(user_id)
+    user = await _get_user(dao, user_id, project_id)
     if user is None:
+        LOCK_OPERATIONS.labels("acquire", "not_found").inc()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    if user.locktime is not None:
+    backend = get_lock_backend()
+    if backend.stores_locktime and user.locktime is not None and not wait:
+        LOCK_OPERATIONS.labels("acquire", "conflict").inc()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User is already locked",
         )
 
-    locked_user = await dao.acquire_lock(user_id)
+    lessee = current_project.get()
+    try:
+        locked_user = await lock_notifier.acquire_with_wait(
+            lambda: backend.acquire(dao, user, lessee), wait, lessee, id=user_id
+        )
+    except LeaseQuotaExceeded:
+        _quota_exceeded("acquire")
     if locked_user is None:
+        LOCK_OPERATIONS.labels("acquire", "conflict").inc()
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT,
             detail="User is already locked",
         )
 
+    LOCK_OPERATIONS.labels("acquire", "success").inc()
+    _audit(db, "acquire", locked_user)
     return locked_user
 
 
 @router.post("/{user_id}/release-lock", response_model=UserRead)
-async def release_lock(user_id: UUID, db: AsyncSession = Depends(get_db_session)):
+async def release_lock(
+    user_id: UUID,
+    project_id: Annotated[UUID | None, Query()] = None,
+    db: AsyncSession = Depends(get_unit_of_work_session, scope="function"),
+):
     dao = UserDAO(db)
 
-    user = await dao.get_by_id(user_id)
+    user = await _get_user(dao, user_id, project_id)
     if user is None:
+        LOCK_OPERATIONS.labels("release", "not_found").inc()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    released_user = await dao.release_lock(user_id)
+    backend = get_lock_backend()
+    _check_holder("release", backend, user)
+    released_user = await backend.release(dao, user, current_project.get())
     if released_user is None:
+        LOCK_OPERATIONS.labels("release", "conflict").inc()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=backend.unlocked_detail,
+        )
+
+    LOCK_OPERATIONS.labels("release", "success").inc()
+    _audit(db, "release", released_user)
+    return released_user
+
+
+@router.post("/{user_id}/renew-lock", response_model=UserRead)
+async def renew_lock(
+    user_id: UUID,
+    project_id: Annotated[UUID | None, Query()] = None,
+    db: AsyncSession = Depends(get_unit_of_work_session, scope="function"),
+):
+    dao = UserDAO(db)
+
+    user = await _get_user(dao, user_id, project_id)
+    if user is None:
+        LOCK_OPERATIONS.labels("renew", "not_found").inc()
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found",
         )
 
-    return released_user
+    backend = get_lock_backend()
+    _check_holder("renew", backend, user)
+    renewed_user = await backend.renew(dao, user, current_project.get())
+    if renewed_user is None:
+        LOCK_OPERATIONS.labels("renew", "conflict").inc()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=backend.unlocked_detail,
+        )
+
+    LOCK_OPERATIONS.labels("renew", "success").inc()
+    _audit(db, "renew", renewed_user)
+    return renewed_user
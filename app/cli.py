@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import inspect
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import AsyncIterator
+
+import uvicorn
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker, dispose_engines
+from app.core.security import shutdown_password_executor
+from app.services.lock_backends import check_lock_backend
+from app.services.user_import import import_user_rows, parse_user_rows
+
+
+async def _read_lines(path: Path) -> AsyncIterator[str]:
+    with path.open(encoding="utf-8", newline="") as file:
+        for line in file:
+            yield line.rstrip("\n")
+
+
+async def _import_users(args: argparse.Namespace) -> None:
+    path = Path(args.path)
+    fmt = args.format or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+    chunk_size = args.chunk_size or get_settings().IMPORT_CHUNK_SIZE
+
+    try:
+        async with async_session_maker() as session:
+            rows = parse_user_rows(_read_lines(path), fmt)
+            result = await import_user_rows(session, rows, chunk_size)
+    finally:
+        shutdown_password_executor()
+        await dispose_engines()
+
+    print(result.model_dump_json(indent=2))
+
+
+def _prepare_multiprocess_metrics() -> Path | None:
+    # Workers inherit the variable and write their metrics under it, which
+    # lets /metrics merge every worker's samples. Files from an earlier run
+    # would be merged in as well, so the directory starts empty. Returns the
+    # directory when it was created here and should be removed afterwards.
+    configured = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if configured is None:
+        path = Path(tempfile.mkdtemp(prefix="botferm-metrics-"))
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = str(path)
+        return path
+    path = Path(configured)
+    path.mkdir(parents=True, exist_ok=True)
+    for stale in path.glob("*.db"):
+        stale.unlink()
+    return None
+
+
+def _serve(args: argparse.Namespace) -> None:
+    settings = get_settings()
+    workers = args.workers or settings.WEB_WORKERS
+    try:
+        check_lock_backend(settings.LOCK_BACKEND, workers)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    created = _prepare_multiprocess_metrics() if workers > 1 else None
+    # Each worker is a separate process with its own pool, warm-up and
+    # lifespan; uvicorn restarts workers that die.
+    try:
+        uvicorn.run(
+            "app.main:app",
+            host=args.host or settings.WEB_HOST,
+            port=args.port or settings.WEB_PORT,
+            workers=workers,
+            log_level=settings.LOG_LEVEL.lower(),
+        )
+    finally:
+        if created is not None:
+            shutil.rmtree(created, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import-users", help="Bulk import users from a CSV or JSONL file"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"])
+    import_parser.add_argument("--chunk-size", type=int)
+    import_parser.set_defaults(handler=_import_users)
+
+    serve_parser = commands.add_parser("serve", help="Run the API with one or more workers")
+    serve_parser.add_argument("--host")
+    serve_parser.add_argument("--port", type=int)
+    serve_parser.add_argument("--workers", type=int)
+    serve_parser.set_defaults(handler=_serve)
+
+    args = parser.parse_args()
+    if inspect.iscoroutinefunction(args.handler):
+        asyncio.run(args.handler(args))
+    else:
+        args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import asyncio
+import os
+from functools import lru_cache
+
+from app.core.config import get_settings
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def acquire(self) -> None:
+        # Reject up front once the queue is full, and give up on a queued
+        # request after queue_timeout, so excess load fails fast instead of
+        # piling up latency for everyone behind it.
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected("queue_full")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+        except TimeoutError:
+            self.rejected += 1
+            raise AdmissionRejected("timeout") from None
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+@lru_cache
+def get_password_hash_limiter() -> AdmissionLimiter:
+    settings = get_settings()
+    return AdmissionLimiter(
+        max_concurrency=settings.PASSWORD_HASH_MAX_CONCURRENCY or os.cpu_count() or 1,
+        max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+        queue_timeout=settings.PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS,
+    )
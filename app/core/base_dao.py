@@ -1,42 +1,205 @@
+from contextlib import asynccontextmanager
 from uuid import UUID
 
-from sqlalchemy import select, update as sqlalchemy_update, delete as sqlalchemy_delete
+from sqlalchemy import (
+    bindparam,
+    select,
+    tuple_,
+    insert as sqlalchemy_insert,
+    update as sqlalchemy_update,
+    delete as sqlalchemy_delete,
+)
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 
+UNIT_OF_WORK = "unit_of_work"
+READ_REPLICA = "read_replica"
+
+_statements: dict = {}
+
+
+@asynccontextmanager
+async def unit_of_work(session: AsyncSession):
+    # Inside a unit of work DAO writes are only flushed; the whole block is
+    # committed once on exit or rolled back together on error.
+    if session.info.get(UNIT_OF_WORK):
+        yield session
+        return
+
+    session.info[UNIT_OF_WORK] = True
+    try:
+        yield session
+        await session.commit()
+    except BaseException:
+        await session.rollback()
+        raise
+    finally:
+        session.info.pop(UNIT_OF_WORK, None)
+
+
 class BaseDAO:
     model = None
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
-    async def find_all(self, **filter_by):
-        stmt = select(self.model).filter_by(**filter_by)
+    @staticmethod
+    def _read(stmt, primary: bool):
+        # Marked reads may be served by the replica; pass primary=True when
+        # the caller must see its own recent writes. Primary reads also
+        # overwrite objects the session loaded earlier, possibly from a
+        # lagging replica, instead of returning them from the identity map.
+        if primary:
+            return stmt.execution_options(populate_existing=True)
+        return stmt.execution_options(**{READ_REPLICA: True})
+
+    @classmethod
+    def _cached(cls, key, build):
+        # Hot statements are built once per DAO class with bind parameters in
+        # place of values, so a call only binds its arguments instead of
+        # rebuilding the statement and its cache key.
+        cache_key = (cls, key)
+        stmt = _statements.get(cache_key)
+        if stmt is None:
+            stmt = _statements[cache_key] = build()
+        return stmt
+
+    @classmethod
+    def _match_params(cls, names):
+        # Prefixed so UPDATE never mistakes a parameter for a SET column.
+        return tuple(getattr(cls.model, name) == bindparam(f"match_{name}") for name in names)
+
+    @staticmethod
+    def _match_values(values):
+        return {f"match_{name}": value for name, value in values.items()}
+
+    async def find_all(self, primary: bool = False, **filter_by):
+        stmt = self._read(select(self.model).filter_by(**filter_by), primary)
         result = await self.session.execute(stmt)
         return result.scalars().all()
 
-    async def find_one(self, **filter_by):
-        stmt = select(self.model).filter_by(**filter_by)
+    async def stream_partitions(self, yield_per: int, primary: bool = False, **filter_by):
+        stmt = self._read(
+            select(self.model)
+            .filter_by(**filter_by)
+            .execution_options(yield_per=yield_per),
+            primary,
+        )
+        result = await self.session.stream_scalars(stmt)
+        async for partition in result.partitions():
+            yield partition
+
+    def _page_stmt(self, entities, limit: int, after, criteria, filter_by):
+        stmt = (
+            select(*entities)
+            .select_from(self.model)
+            .filter_by(**filter_by)
+            .where(*criteria)
+            .order_by(self.model.created_at, self.model.id)  # type: ignore[attr-defined]
+            .limit(limit)
+        )
+        if after is not None:
+            stmt = stmt.where(
+                tuple_(self.model.created_at, self.model.id) > tuple_(*after)  # type: ignore[attr-defined]
+            )
+        # Pages back listings and dashboards, which tolerate replica lag.
+        return self._read(stmt, primary=False)
+
+    async def find_page(self, limit: int, after=None, criteria=(), **filter_by):
+        stmt = self._page_stmt((self.model,), limit, after, criteria, filter_by)
         result = await self.session.execute(stmt)
-        return result.scalars().first()
+        return result.scalars().all()
 
-    async def get_by_id(self, id_: UUID):
-        stmt = select(self.model).where(self.model.id == id_)  # type: ignore[attr-defined]
+    async def find_page_rows(self, columns, limit: int, after=None, criteria=(), **filter_by):
+        # Plain column rows skip ORM identity-map bookkeeping and instance
+        # hydration; callers get dicts ready for serialization.
+        stmt = self._page_stmt(columns, limit, after, criteria, filter_by)
         result = await self.session.execute(stmt)
+        return [row._asdict() for row in result]
+
+    async def find_one(self, primary: bool = False, **filter_by):
+        if None in filter_by.values():
+            # "= NULL" never matches; let filter_by render IS NULL instead.
+            stmt = self._read(select(self.model).filter_by(**filter_by), primary)
+            result = await self.session.execute(stmt)
+            return result.scalars().first()
+
+        names = tuple(sorted(filter_by))
+        stmt = self._cached(
+            ("find_one", names, primary),
+            lambda: self._read(select(self.model).where(*self._match_params(names)), primary),
+        )
+        result = await self.session.execute(stmt, self._match_values(filter_by))
         return result.scalars().first()
 
-    async def create(self, obj_in):
-        obj = self.model(**obj_in)  # type: ignore[call-arg]
-        self.session.add(obj)
+    async def get_by_id(self, id_: UUID, primary: bool = False, **filter_by):
+        # Extra matches such as a partition key narrow where the row is looked up.
+        names = ("id", *sorted(filter_by))
+        stmt = self._cached(
+            ("get_by_id", primary, names),
+            lambda: self._read(select(self.model).where(*self._match_params(names)), primary),
+        )
+        result = await self.session.execute(stmt, self._match_values({"id": id_, **filter_by}))
+        return result.scalars().first()
+
+    async def get_many(self, ids, primary: bool = False):
+        stmt = self._read(
+            select(self.model).where(self.model.id.in_(ids)),  # type: ignore[attr-defined]
+            primary,
+        )
+        result = await self.session.execute(stmt)
+        return result.scalars().all()
+
+    async def _commit(self):
+        if self.session.info.get(UNIT_OF_WORK):
+            await self.session.flush()
+            return
         try:
             await self.session.commit()
         except SQLAlchemyError:
             await self.session.rollback()
             raise
-        await self.session.refresh(obj)
+
+    async def _write(self, stmt, params=None):
+        try:
+            return await self.session.execute(stmt, params)
+        except SQLAlchemyError:
+            # Inside a unit of work the transaction belongs to the caller,
+            # which rolls it back as a whole; rolling back here would
+            # silently discard its earlier writes.
+            if not self.session.info.get(UNIT_OF_WORK):
+                await self.session.rollback()
+            raise
+
+    async def create(self, obj_in):
+        # RETURNING brings server defaults such as created_at back with the
+        # INSERT instead of a separate refresh SELECT.
+        stmt = sqlalchemy_insert(self.model).values(**obj_in).returning(self.model)  # type: ignore[arg-type]
+        result = await self._write(stmt)
+        obj = result.scalar_one()
+        await self._commit()
         return obj
 
+    async def create_many(self, objs_in):
+        if not objs_in:
+            return []
+        stmt = sqlalchemy_insert(self.model).returning(  # type: ignore[arg-type]
+            self.model, sort_by_parameter_order=True
+        )
+        result = await self._write(stmt, list(objs_in))
+        objs = result.scalars().all()
+        await self._commit()
+        return objs
+
+    async def insert_many(self, objs_in):
+        # For append-only writes that need nothing back: no RETURNING, and
+        # the driver batches the rows into multi-row INSERTs.
+        if not objs_in:
+            return
+        await self._write(sqlalchemy_insert(self.model), list(objs_in))  # type: ignore[arg-type]
+        await self._commit()
+
     async def update(self, id_: UUID, values):
         stmt = (
             sqlalchemy_update(self.model)  # type: ignore[arg-type]
@@ -46,18 +209,37 @@ class BaseDAO:
         )
         result = await self.session.execute(stmt)
         obj = result.scalar_one_or_none()
-        try:
-            await self.session.commit()
-        except SQLAlchemyError:
-            await self.session.rollback()
-            raise
+        await self._commit()
         return obj
 
+    async def update_many(self, ids, values):
+        if not ids:
+            return []
+        stmt = (
+            sqlalchemy_update(self.model)  # type: ignore[arg-type]
+            .where(self.model.id.in_(ids))  # type: ignore[attr-defined]
+            .values(**values)
+            .returning(self.model)  # type: ignore[arg-type]
+        )
+        result = await self.session.execute(stmt)
+        objs = result.scalars().all()
+        await self._commit()
+        return objs
+
     async def delete(self, id_: UUID):
         stmt = sqlalchemy_delete(self.model).where(self.model.id == id_)  # type: ignore[arg-type]
         await self.session.execute(stmt)
-        try:
-            await self.session.commit()
-        except SQLAlchemyError:
-            await self.session.rollback()
-            raise
+        await self._commit()
+
+    async def delete_many(self, ids):
+        if not ids:
+            return []
+        stmt = (
+            sqlalchemy_delete(self.model)  # type: ignore[arg-type]
+            .where(self.model.id.in_(ids))  # type: ignore[attr-defined]
+            .returning(self.model.id)  # type: ignore[attr-defined]
+        )
+        result = await self.session.execute(stmt)
+        deleted = result.scalars().all()
+        await self._commit()
+        return deleted
@@ -1,8 +1,11 @@
 from pathlib import Path
 from functools import lru_cache
+from typing import Literal
+from uuid import UUID
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import Field
+from sqlalchemy.engine import make_url
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 ENV_FILE = BASE_DIR / ".env"
@@ -10,6 +13,7 @@ ENV_FILE = BASE_DIR / ".env"
 
 class Settings(BaseSettings):
     DATABASE_URL: str | None = Field(default=None)
+    DATABASE_REPLICA_URL: str | None = Field(default=None)
 
     DB_HOST: str
     DB_PORT: int
@@ -17,11 +21,69 @@ class Settings(BaseSettings):
     DB_USER: str
     DB_PASSWORD: str
 
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_WARMUP: bool = True
+    DB_QUERY_CACHE_SIZE: int = 500
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 100
+    # Behind pgbouncer in transaction mode: give every prepared statement a
+    # unique name.
+    DB_PGBOUNCER_TRANSACTION_MODE: bool = False
+
+    WEB_HOST: str = "0.0.0.0"
+    WEB_PORT: int = 8000
+    WEB_WORKERS: int = 1
+    # How often each worker copies its pool and admission stats into the
+    # metrics that /metrics merges across workers.
+    METRICS_PUBLISH_INTERVAL_SECONDS: float = 5.0
+
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
 
+    PASSWORD_HASH_EXECUTOR: Literal["thread", "process"] = "thread"
+    PASSWORD_HASH_WORKERS: int | None = None
+    PASSWORD_HASH_MAX_CONCURRENCY: int | None = None
+    PASSWORD_HASH_MAX_QUEUE: int = 100
+    PASSWORD_HASH_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    CREDENTIAL_CACHE_SIZE: int = 10_000
+    CREDENTIAL_CACHE_TTL_SECONDS: float = 300.0
+
+    TOKEN_CLAIMS_CACHE_SIZE: int = 10_000
+    TOKEN_CLAIMS_CACHE_TTL_SECONDS: float = 60.0
+
+    IMPORT_CHUNK_SIZE: int = 1000
+    EXPORT_YIELD_PER: int = 1000
+
     LOG_LEVEL: str = "INFO"
 
+    LEASE_TTL_SECONDS: int = 600
+    LEASE_REAPER_INTERVAL_SECONDS: float = 30.0
+    LEASE_REAPER_BATCH_SIZE: int = 1000
+
+    LOCK_WAIT_POLL_INTERVAL_SECONDS: float = 1.0
+
+    LEASE_AUDIT_ENABLED: bool = True
+    LEASE_AUDIT_QUEUE_SIZE: int = 10_000
+    LEASE_AUDIT_BATCH_SIZE: int = 500
+    LEASE_AUDIT_FLUSH_INTERVAL_SECONDS: float = 1.0
+    # "locktime" stores leases in users.locktime. "advisory" and "memory" keep
+    # them per process: users.locktime does not show them, so the list's
+    # locked filter is refused. Both only run with one worker.
+    LOCK_BACKEND: Literal["locktime", "advisory", "memory"] = "locktime"
+    LOCK_CLAIM_SCAN_LIMIT: int = 1000
+    # Concurrent leases a project may hold, keyed by the leasing project's
+    # id. Projects not listed get LEASE_QUOTA_DEFAULT; None means unlimited.
+    LEASE_QUOTA_DEFAULT: int | None = None
+    LEASE_QUOTAS: dict[UUID, int] = {}
+    # Relative share of released users handed to waiting projects.
+    LEASE_WEIGHT_DEFAULT: int = 1
+    LEASE_WEIGHTS: dict[UUID, int] = {}
+
     model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore")
 
     def async_db_url(self) -> str:
@@ -32,6 +94,18 @@ class Settings(BaseSettings):
             f"@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
         )
 
+    def lease_quota(self, project_id: UUID | None) -> int | None:
+        if project_id is None:
+            return None
+        return self.LEASE_QUOTAS.get(project_id, self.LEASE_QUOTA_DEFAULT)
+
+    def lease_weight(self, project_id: UUID | None) -> int:
+        return self.LEASE_WEIGHTS.get(project_id, self.LEASE_WEIGHT_DEFAULT)
+
+    def asyncpg_dsn(self) -> str:
+        url = make_url(self.async_db_url()).set(drivername="postgresql")
+        return url.render_as_string(hide_password=False)
+
 
 @lru_cache
 def get_settings() -> Settings:
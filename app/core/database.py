@@ -1,29 +1,157 @@
+import time
+from dataclasses import dataclass
 from datetime import datetime
 from typing import AsyncIterator
+from uuid import uuid4
 
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     create_async_engine,
     async_sessionmaker,
     AsyncAttrs,
     AsyncSession,
 )
-from sqlalchemy.orm import declared_attr, Mapped, mapped_column, DeclarativeBase
-from sqlalchemy import func, DateTime
+from sqlalchemy.orm import declared_attr, Mapped, mapped_column, DeclarativeBase, Session
+from sqlalchemy import exc, func, DateTime
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-from app.core.config import get_async_db_url
+from app.core.base_dao import READ_REPLICA, unit_of_work
+from app.core.config import get_async_db_url, get_settings
+from app.core.metrics import instrument_engine
 
 DATABASE_URL = get_async_db_url()
 
-engine = create_async_engine(
-    DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-)
-async_session_maker = async_sessionmaker(
-    bind=engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-)
+
+@dataclass
+class PoolWaitStats:
+    checkouts: int = 0
+    timeouts: int = 0
+    wait_seconds_total: float = 0.0
+    wait_seconds_max: float = 0.0
+
+    def observe(self, wait_seconds: float) -> None:
+        self.checkouts += 1
+        self.wait_seconds_total += wait_seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, wait_seconds)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.timeouts += 1
+            raise
+        self.wait_stats.observe(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
+
+
+def create_engine(url: str) -> AsyncEngine:
+    settings = get_settings()
+    connect_args = {
+        "prepared_statement_cache_size": settings.DB_PREPARED_STATEMENT_CACHE_SIZE,
+    }
+    if settings.DB_PGBOUNCER_TRANSACTION_MODE:
+        # pgbouncer may run a transaction on a server connection where
+        # another client already prepared asyncpg's default statement names.
+        # Turning the cache off is not enough, because asyncpg still names
+        # every statement it prepares.
+        connect_args["prepared_statement_name_func"] = _unique_statement_name
+    return create_async_engine(
+        url,
+        echo=False,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        # Compiled SQL is cached per engine; asyncpg additionally keeps that
+        # many server-side prepared statements per connection (0 re-prepares
+        # every statement).
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        connect_args=connect_args,
+    )
+
+
+def get_pool_stats(engine: AsyncEngine) -> dict:
+    pool = engine.pool
+    stats = {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
+    wait_stats = getattr(pool, "wait_stats", None)
+    if wait_stats is not None:
+        stats.update(
+            checkouts=wait_stats.checkouts,
+            timeouts=wait_stats.timeouts,
+            wait_seconds_total=wait_stats.wait_seconds_total,
+            wait_seconds_max=wait_stats.wait_seconds_max,
+        )
+    return stats
+
+
+class RoutingSession(Session):
+    def __init__(self, *args, replica_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        # Only statements the DAO marked as replica reads leave the primary;
+        # writes, lock transitions and flushes always stay on it.
+        if (
+            self.replica_bind is not None
+            and clause is not None
+            and not self._flushing
+            and clause.get_execution_options().get(READ_REPLICA)
+        ):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+def create_session_maker(
+    primary: AsyncEngine, replica: AsyncEngine | None = None
+) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        replica_bind=replica.sync_engine if replica is not None else None,
+        expire_on_commit=False,
+    )
+
+
+engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
+
+replica_engine = None
+if get_settings().DATABASE_REPLICA_URL:
+    replica_engine = create_engine(get_settings().DATABASE_REPLICA_URL)
+    instrument_engine(replica_engine)
+
+async_session_maker = create_session_maker(engine, replica_engine)
+
+
+async def dispose_engines() -> None:
+    await engine.dispose()
+    if replica_engine is not None:
+        await replica_engine.dispose()
 
 
 class Base(AsyncAttrs, DeclarativeBase):
@@ -42,3 +170,9 @@ class Base(AsyncAttrs, DeclarativeBase):
 async def get_db_session() -> AsyncIterator[AsyncSession]:
     async with async_session_maker() as session:
         yield session
+
+
+async def get_unit_of_work_session() -> AsyncIterator[AsyncSession]:
+    async with async_session_maker() as session:
+        async with unit_of_work(session):
+            yield session
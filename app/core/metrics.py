@@ -0,0 +1,182 @@
+import asyncio
+import os
+import time
+from typing import Callable
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+HTTP_REQUEST_DURATION = Histogram(
+    "botferm_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "botferm_http_requests_in_flight",
+    "HTTP requests currently being served.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+LOCK_OPERATIONS = Counter(
+    "botferm_lock_operations_total",
+    "Lock operations by outcome.",
+    ["operation", "outcome"],
+)
+LOGIN_ATTEMPTS = Counter(
+    "botferm_login_attempts_total",
+    "Login attempts by outcome.",
+    ["outcome"],
+)
+LEASE_AUDIT_EVENTS = Counter(
+    "botferm_lease_audit_events_total",
+    "Lease audit events by outcome.",
+    ["outcome"],
+)
+ADMISSION_REJECTED = Counter(
+    "botferm_admission_rejected_total",
+    "Requests shed by an admission limiter.",
+    ["limiter", "reason"],
+)
+DB_STATEMENT_DURATION = Histogram(
+    "botferm_db_statement_duration_seconds",
+    "Database statement execution time by statement type.",
+    ["statement"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+# Gauges are summed over live workers; counters over every worker that ran.
+DB_POOL_GAUGES = {
+    name: Gauge(f"botferm_db_pool_{name}", f"Connection pool {name}.", multiprocess_mode="livesum")
+    for name in ("size", "checked_in", "checked_out", "overflow")
+}
+DB_POOL_COUNTERS = {
+    key: Counter(f"botferm_db_pool_{name}", f"Connection pool {name}.")
+    for name, key in (
+        ("checkouts", "checkouts"),
+        ("timeouts", "timeouts"),
+        ("wait_seconds", "wait_seconds_total"),
+    )
+}
+ADMISSION_GAUGES = {
+    name: Gauge(
+        f"botferm_admission_{name}",
+        f"Admission limiter {name} requests.",
+        ["limiter"],
+        multiprocess_mode="livesum",
+    )
+    for name in ("active", "waiting")
+}
+
+
+def multiprocess_enabled() -> bool:
+    return "PROMETHEUS_MULTIPROC_DIR" in os.environ
+
+
+def metrics_registry() -> CollectorRegistry:
+    # With several workers each one writes its samples to files in
+    # PROMETHEUS_MULTIPROC_DIR; the scrape merges them, so it does not
+    # matter which worker answers it.
+    if not multiprocess_enabled():
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def mark_worker_dead() -> None:
+    # Drops this worker's live gauges from the merged view on shutdown.
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(os.getpid())
+
+
+def _route_template(scope: Scope) -> str:
+    # The router stores the matched route in the scope, so the template is
+    # known once the request has been handled.
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_flight.dec()
+            HTTP_REQUEST_DURATION.labels(
+                method, _route_template(scope), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["statement_started"].pop()
+        keyword = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_STATEMENT_DURATION.labels(keyword or "UNKNOWN").observe(time.perf_counter() - started)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(context):
+        if context.connection is not None:
+            started = context.connection.info.get("statement_started")
+            if started:
+                started.pop()
+
+
+class StatsPublisher:
+    # Pool and admission state lives in each worker's memory. Publishing
+    # copies it into the metrics above: gauges are set, counters advance by
+    # the change since the last publish. Workers publish periodically and
+    # the worker serving a scrape publishes first, so its own numbers are
+    # current and the others' are at most one interval old.
+    def __init__(
+        self,
+        get_pool_stats: Callable[[], dict],
+        admission: dict[str, Callable[[], dict]],
+    ):
+        self.get_pool_stats = get_pool_stats
+        self.admission = admission
+        self._published: dict[str, float] = {}
+
+    def publish(self) -> None:
+        stats = self.get_pool_stats()
+        for name, gauge in DB_POOL_GAUGES.items():
+            gauge.set(stats[name])
+        for key, counter in DB_POOL_COUNTERS.items():
+            value = stats.get(key, 0)
+            counter.inc(max(0, value - self._published.get(key, 0)))
+            self._published[key] = value
+        for limiter, get_stats in self.admission.items():
+            limiter_stats = get_stats()
+            for name, gauge in ADMISSION_GAUGES.items():
+                gauge.labels(limiter).set(limiter_stats[name])
+
+    async def run(self, interval: float) -> None:
+        while True:
+            self.publish()
+            await asyncio.sleep(interval)
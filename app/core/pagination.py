@@ -0,0 +1,17 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import datetime
+from uuid import UUID
+
+
+def encode_cursor(created_at: datetime, id_: UUID) -> str:
+    raw = f"{created_at.isoformat()}|{id_}"
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        created_at, id_ = urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(created_at), UUID(id_)
+    except (BinasciiError, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
@@ -1,9 +1,16 @@
+import asyncio
+import hashlib
+import hmac
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any
 
-from jose import jwt
+from jose import JWTError, jwt
 from passlib.context import CryptContext
 
+from app.core.cache import TTLCache
 from app.core.config import get_settings
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
@@ -17,6 +24,76 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+_password_executor: Executor | None = None
+
+
+def get_password_executor() -> Executor:
+    global _password_executor
+    if _password_executor is None:
+        settings = get_settings()
+        if settings.PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+            )
+        else:
+            # hashlib releases the GIL while running pbkdf2, so threads hash
+            # in parallel without the pickling cost of a process pool.
+            _password_executor = ThreadPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                thread_name_prefix="password-hash",
+            )
+    return _password_executor
+
+
+def shutdown_password_executor() -> None:
+    global _password_executor
+    if _password_executor is not None:
+        _password_executor.shutdown(wait=True, cancel_futures=True)
+        _password_executor = None
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_password_executor(), verify_password, plain_password, hashed_password
+    )
+
+
+async def get_password_hash_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), get_password_hash, password)
+
+
+@lru_cache
+def get_credential_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(
+        maxsize=settings.CREDENTIAL_CACHE_SIZE,
+        ttl=settings.CREDENTIAL_CACHE_TTL_SECONDS,
+    )
+
+
+def _credential_cache_key(login: str, plain_password: str, hashed_password: str) -> bytes:
+    # The stored hash is part of the key, so changing a password makes every
+    # cached entry for the old hash unreachable.
+    message = "\0".join((login, plain_password, hashed_password)).encode()
+    return hmac.new(get_settings().SECRET_KEY.encode(), message, hashlib.sha256).digest()
+
+
+async def verify_password_cached(
+    login: str, plain_password: str, hashed_password: str
+) -> bool:
+    cache = get_credential_cache()
+    key = _credential_cache_key(login, plain_password, hashed_password)
+    if cache.get(key):
+        return True
+
+    verified = await verify_password_async(plain_password, hashed_password)
+    if verified:
+        cache.set(key, True)
+    return verified
+
+
 def create_jwt_token(
     data: dict[str, Any], expires_delta: timedelta, token_type: str = "access"
 ) -> str:
@@ -31,3 +108,28 @@ def create_jwt_token(
         algorithm=settings.ALGORITHM,
     )
     return encoded_jwt
+
+
+@lru_cache
+def get_claims_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(
+        maxsize=settings.TOKEN_CLAIMS_CACHE_SIZE,
+        ttl=settings.TOKEN_CLAIMS_CACHE_TTL_SECONDS,
+    )
+
+
+def verify_access_token(token: str) -> dict[str, Any]:
+    cache = get_claims_cache()
+    claims = cache.get(token)
+    if claims is not None:
+        return claims
+
+    settings = get_settings()
+    claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    if claims.get("type") != "access":
+        raise JWTError("Not an access token")
+
+    # Never keep a token cached past its own expiry.
+    cache.set(token, claims, ttl=min(cache.ttl, claims["exp"] - time.time()))
+    return claims
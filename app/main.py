@@ -1,9 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from datetime import timedelta
+
+from fastapi import FastAPI, Request, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.api.v1.users import router as users_v1_router
 from app.api.v1.auth import router as auth_v1_router
+from app.api.v1.internal import router as internal_v1_router
+from app.core.admission import get_password_hash_limiter
+from app.core.config import get_settings
+from app.core.database import async_session_maker, dispose_engines, engine, get_pool_stats
+from app.core.metrics import (
+    MetricsMiddleware,
+    StatsPublisher,
+    mark_worker_dead,
+    metrics_registry,
+)
+from app.core.security import shutdown_password_executor
+from app.services.lease_audit import lease_audit
+from app.services.lease_reaper import run_lease_reaper
+from app.services.lock_backends import get_lock_backend
+from app.services.lock_notifier import lock_notifier
+from app.services.pool_warmup import warm_up_pool
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    app.state.ready = False
+    if settings.DB_POOL_WARMUP:
+        await warm_up_pool(async_session_maker, settings.DB_POOL_SIZE)
+    await lock_notifier.start(settings.asyncpg_dsn())
+    lock_backend = get_lock_backend()
+    await lock_backend.start(settings.asyncpg_dsn())
+    if settings.LEASE_AUDIT_ENABLED:
+        await lease_audit.start(async_session_maker)
+    reaper = asyncio.create_task(
+        run_lease_reaper(
+            async_session_maker,
+            ttl=timedelta(seconds=settings.LEASE_TTL_SECONDS),
+            interval=settings.LEASE_REAPER_INTERVAL_SECONDS,
+            batch_size=settings.LEASE_REAPER_BATCH_SIZE,
+            release_expired=lock_backend.release_expired,
+        )
+    )
+    publisher = asyncio.create_task(
+        stats_publisher.run(settings.METRICS_PUBLISH_INTERVAL_SECONDS)
+    )
+    app.state.ready = True
+    yield
+    app.state.ready = False
+    for task in (reaper, publisher):
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    await lock_backend.stop()
+    await lock_notifier.stop()
+    await lease_audit.stop()
+    shutdown_password_executor()
+    await dispose_engines()
+    mark_worker_dead()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
-app = FastAPI()
+stats_publisher = StatsPublisher(
+    lambda: get_pool_stats(engine),
+    {"password_hash": lambda: get_password_hash_limiter().stats()},
+)
 
 app.include_router(users_v1_router)
 app.include_router(auth_v1_router)
+app.include_router(internal_v1_router)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    stats_publisher.publish()
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/health", include_in_schema=False)
+async def health(request: Request, response: Response):
+    if not getattr(request.app.state, "ready", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return {"status": "starting"}
+    return {"status": "ready"}
@@ -1 +1,3 @@
 from .user import User
+from .user_login import UserLogin
+from .lease_event import LeaseEvent
@@ -0,0 +1,35 @@
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, String, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID as PGUUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class LeaseEvent(Base):
+    __tablename__ = "lease_events"
+    __table_args__ = (
+        Index("ix_lease_events_user_id_occurred_at", "user_id", "occurred_at"),
+    )
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+
+    # No foreign key: the history outlives deleted users.
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        nullable=False,
+    )
+
+    action: Mapped[str] = mapped_column(String, nullable=False)
+    actor: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # When the change was recorded after its commit. The inherited created_at
+    # is when the writer flushed the event, which can lag behind by up to the
+    # flush interval, so history queries use occurred_at.
+    occurred_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+    )
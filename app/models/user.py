@@ -3,23 +3,53 @@ from datetime import datetime
 from typing import Optional
 
 
-from sqlalchemy import String, DateTime
+from sqlalchemy import DDL, String, DateTime, Index, event, text
 from sqlalchemy.dialects.postgresql import UUID as PGUUID, CITEXT
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.core.database import Base
 
 
+USER_PARTITIONS = 16
+
+
 class User(Base):
+    # Hash-partitioned by project_id: queries that match project_id touch one
+    # partition. The table's primary key has to include the partition key;
+    # user_logins keeps ids unique on their own, so the ORM identity stays id.
+    __table_args__ = (
+        Index("ix_users_project_id_env_domain", "project_id", "env", "domain"),
+        Index(
+            "ix_users_free_pool",
+            "project_id",
+            "env",
+            "domain",
+            "id",
+            postgresql_where=text("locktime IS NULL"),
+        ),
+        Index(
+            "ix_users_locktime",
+            "locktime",
+            postgresql_where=text("locktime IS NOT NULL"),
+        ),
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index(
+            "ix_users_lessee_project_id",
+            "lessee_project_id",
+            postgresql_where=text("lessee_project_id IS NOT NULL"),
+        ),
+        {"postgresql_partition_by": "HASH (project_id)"},
+    )
+
     id: Mapped[uuid.UUID] = mapped_column(
         PGUUID(as_uuid=True),
         primary_key=True,
         default=uuid.uuid4,
     )
 
+    # Unique across partitions through user_logins.
     login: Mapped[str] = mapped_column(
         CITEXT(),
-        unique=True,
         index=True,
         nullable=False,
     )
@@ -31,7 +61,7 @@ class User(Base):
 
     project_id: Mapped[uuid.UUID] = mapped_column(
         PGUUID(as_uuid=True),
-        nullable=False,
+        primary_key=True,
     )
 
     env: Mapped[str] = mapped_column(String, nullable=False)
@@ -41,3 +71,75 @@ class User(Base):
         DateTime(timezone=True),
         nullable=True,
     )
+
+    # Project holding the current lease, counted against its quota.
+    lessee_project_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        PGUUID(as_uuid=True),
+        nullable=True,
+    )
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Keeps user_logins in step with users. A login already claimed by another
+# user, or an id already used by another user, raises unique_violation,
+# which callers see as an IntegrityError like the former unique indexes. A
+# claim made earlier for the same login and id is accepted, so imports can
+# reserve logins up front; the id is then checked against users directly.
+CLAIM_LOGIN_FUNCTION = DDL(
+    """
+    CREATE OR REPLACE FUNCTION users_claim_login() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM user_logins WHERE login = OLD.login AND user_id = OLD.id;
+            RETURN NULL;
+        END IF;
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.login IS NOT DISTINCT FROM NEW.login THEN
+                RETURN NULL;
+            END IF;
+            DELETE FROM user_logins WHERE login = OLD.login AND user_id = OLD.id;
+        END IF;
+        INSERT INTO user_logins (login, user_id) VALUES (NEW.login, NEW.id)
+        ON CONFLICT (login) DO NOTHING;
+        IF FOUND THEN
+            RETURN NULL;
+        END IF;
+        IF NOT EXISTS (
+            SELECT 1 FROM user_logins WHERE login = NEW.login AND user_id = NEW.id
+        ) THEN
+            RAISE unique_violation USING
+                MESSAGE = format('duplicate login "%s"', NEW.login),
+                CONSTRAINT = 'user_logins_pkey';
+        END IF;
+        IF (SELECT count(*) FROM users WHERE id = NEW.id) > 1 THEN
+            RAISE unique_violation USING
+                MESSAGE = format('duplicate user id "%s"', NEW.id),
+                CONSTRAINT = 'user_logins_user_id_key';
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """
+)
+
+CLAIM_LOGIN_TRIGGER = DDL(
+    "CREATE TRIGGER users_claim_login "
+    "AFTER INSERT OR UPDATE OF login OR DELETE ON users "
+    "FOR EACH ROW EXECUTE FUNCTION users_claim_login()"
+)
+
+
+# create_all only creates the parent table; the migration does the same
+# for existing databases.
+for remainder in range(USER_PARTITIONS):
+    event.listen(
+        User.__table__,
+        "after_create",
+        DDL(
+            f"CREATE TABLE users_p{remainder} PARTITION OF users "
+            f"FOR VALUES WITH (MODULUS {USER_PARTITIONS}, REMAINDER {remainder})"
+        ),
+    )
+event.listen(User.__table__, "after_create", CLAIM_LOGIN_FUNCTION)
+event.listen(User.__table__, "after_create", CLAIM_LOGIN_TRIGGER)
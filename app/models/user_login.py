@@ -0,0 +1,22 @@
+import uuid
+
+from sqlalchemy.dialects.postgresql import UUID as PGUUID, CITEXT
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class UserLogin(Base):
+    # users is partitioned by project_id, and a partitioned table can only
+    # enforce uniqueness that includes the partition key. Logins are claimed
+    # here instead, one per user id, which keeps ids unique as well; the
+    # users_claim_login trigger keeps this table in sync.
+    __tablename__ = "user_logins"
+
+    login: Mapped[str] = mapped_column(CITEXT(), primary_key=True)
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True),
+        nullable=False,
+        unique=True,
+    )
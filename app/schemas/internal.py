@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+
+
+# Both describe only the worker process that served the request; with
+# several workers, /metrics has the merged view.
+class PoolStats(BaseModel):
+    worker_pid: int
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+
+class AdmissionStats(BaseModel):
+    worker_pid: int
+    max_concurrency: int
+    max_queue: int
+    active: int
+    waiting: int
+    rejected: int
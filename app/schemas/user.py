@@ -1,8 +1,14 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, TypedDict
 from uuid import UUID
 
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, TypeAdapter
+
+MAX_BATCH_SIZE = 1000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_EXPORT_YIELD_PER = 10_000
+MAX_LOCK_WAIT_SECONDS = 60
 
 
 class UserBase(BaseModel):
@@ -16,9 +22,86 @@ class UserCreate(UserBase):
     password: str
 
 
+class UserFilter(BaseModel):
+    project_id: Optional[UUID] = None
+    env: Optional[str] = None
+    domain: Optional[str] = None
+
+    def filter_by(self) -> dict:
+        return self.model_dump(include=set(UserFilter.model_fields), exclude_none=True)
+
+
+class UserClaimQuery(UserFilter):
+    wait: float = Field(default=0, ge=0, le=MAX_LOCK_WAIT_SECONDS)
+
+
 class UserRead(UserBase):
     id: UUID
     locktime: Optional[datetime]
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UserPageQuery(UserFilter):
+    locked: Optional[bool] = None
+    limit: int = Field(default=DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)
+    cursor: Optional[str] = None
+
+
+class UserExportQuery(UserFilter):
+    yield_per: Optional[int] = Field(default=None, ge=1, le=MAX_EXPORT_YIELD_PER)
+
+
+class UserPage(BaseModel):
+    items: list[UserRead]
+    next_cursor: Optional[str]
+
+
+class UserReadRow(TypedDict):
+    login: str
+    project_id: UUID
+    env: str
+    domain: str
+    id: UUID
+    locktime: Optional[datetime]
+    created_at: datetime
+
+
+class UserPageRows(TypedDict):
+    items: list[UserReadRow]
+    next_cursor: Optional[str]
+
+
+# Serializes rows fetched from the database straight to JSON with the same
+# shape as UserPage, without building a model per row.
+user_page_adapter = TypeAdapter(UserPageRows)
+
+
+class UserClaimBatch(UserFilter):
+    count: int = Field(gt=0, le=MAX_BATCH_SIZE)
+
+
+class UserIds(BaseModel):
+    ids: list[UUID] = Field(min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class UserClaimBatchResult(BaseModel):
+    users: list[UserRead]
+    requested: int
+
+
+class UserBatchLockResult(BaseModel):
+    users: list[UserRead]
+    failed: list[UUID]
+
+
+class UserImportError(BaseModel):
+    row: int
+    login: Optional[str] = None
+    detail: str
+
+
+class UserImportResult(BaseModel):
+    created: int = 0
+    errors: list[UserImportError] = Field(default_factory=list)
@@ -0,0 +1,143 @@
+import asyncio
+import logging
+from contextlib import suppress
+from datetime import datetime, timezone
+from functools import partial
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from sqlalchemy.orm import Session
+
+from app.core.base_dao import UNIT_OF_WORK
+from app.core.config import get_settings
+from app.core.metrics import LEASE_AUDIT_EVENTS
+from app.services.lease_event_dao import LeaseEventDAO
+
+logger = logging.getLogger(__name__)
+
+_DEFERRED = "lease_audit_events"
+
+
+class LeaseAuditWriter:
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self._queue: asyncio.Queue[dict] | None = None
+        self._pending: list[dict] = []
+        self._task: asyncio.Task | None = None
+        self._session_maker: async_sessionmaker[AsyncSession] | None = None
+
+    async def start(self, session_maker: async_sessionmaker[AsyncSession]) -> None:
+        self._session_maker = session_maker
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        # Cancelling interrupts the wait for the next event; whatever is
+        # pending or still queued is then written before returning.
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        remaining, self._pending = self._pending, []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        self._queue = None
+        for start in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[start : start + self.batch_size])
+
+    def record(self, action: str, user_id, actor: str | None = None) -> None:
+        # Never blocks the request: when the queue is full the event is
+        # counted and dropped. Nothing is recorded while the writer is off.
+        if self._queue is None:
+            return
+        event = {
+            "user_id": user_id,
+            "action": action,
+            "actor": actor,
+            "occurred_at": datetime.now(timezone.utc),
+        }
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            LEASE_AUDIT_EVENTS.labels("dropped").inc()
+
+    def record_after_commit(
+        self, session: AsyncSession, action: str, user_ids, actor: str | None = None
+    ) -> None:
+        # Inside a unit of work the events wait on the session until it
+        # commits and are dropped if it does not; otherwise the DAO has
+        # already committed the change and the events are recorded now.
+        if not session.info.get(UNIT_OF_WORK):
+            for user_id in user_ids:
+                self.record(action, user_id, actor)
+            return
+        session.info.setdefault(_DEFERRED, []).extend(
+            partial(self.record, action, user_id, actor) for user_id in user_ids
+        )
+
+    async def _collect(self) -> None:
+        # Events move into _pending as they are taken off the queue, so a
+        # stop in the middle of collecting still flushes them.
+        self._pending.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(self._pending) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                self._pending.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except TimeoutError:
+                break
+
+    async def _flush(self, batch: list[dict]) -> None:
+        try:
+            async with self._session_maker() as session:
+                await LeaseEventDAO(session).insert_many(batch)
+        except Exception:
+            self.dropped += len(batch)
+            LEASE_AUDIT_EVENTS.labels("dropped").inc(len(batch))
+            logger.exception("Failed to write %d lease events", len(batch))
+            return
+        self.written += len(batch)
+        LEASE_AUDIT_EVENTS.labels("written").inc(len(batch))
+
+    async def _run(self) -> None:
+        flush = None
+        try:
+            while True:
+                await self._collect()
+                batch, self._pending = self._pending, []
+                # Shielded so stopping never interrupts an INSERT mid-flight.
+                flush = asyncio.ensure_future(self._flush(batch))
+                await asyncio.shield(flush)
+        except asyncio.CancelledError:
+            if flush is not None:
+                await flush
+            raise
+
+
+@event.listens_for(Session, "after_commit")
+def _record_deferred(session: Session) -> None:
+    for record in session.info.pop(_DEFERRED, ()):
+        record()
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _drop_deferred(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_DEFERRED, None)
+
+
+lease_audit = LeaseAuditWriter(
+    max_queue=get_settings().LEASE_AUDIT_QUEUE_SIZE,
+    batch_size=get_settings().LEASE_AUDIT_BATCH_SIZE,
+    flush_interval=get_settings().LEASE_AUDIT_FLUSH_INTERVAL_SECONDS,
+)
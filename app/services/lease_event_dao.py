@@ -0,0 +1,6 @@
+from app.core.base_dao import BaseDAO
+from app.models.lease_event import LeaseEvent
+
+
+class LeaseEventDAO(BaseDAO):
+    model = LeaseEvent
@@ -0,0 +1,43 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.services.lease_audit import lease_audit
+from app.services.user_dao import UserDAO
+
+logger = logging.getLogger(__name__)
+
+
+async def reap_expired_leases(
+    session_maker: async_sessionmaker[AsyncSession],
+    ttl: timedelta,
+    batch_size: int,
+) -> int:
+    released = 0
+    while True:
+        async with session_maker() as session:
+            users = await UserDAO(session).release_expired(ttl, batch_size)
+            lease_audit.record_after_commit(session, "expire", [user.id for user in users])
+        released += len(users)
+        if len(users) < batch_size:
+            return released
+
+
+async def run_lease_reaper(
+    session_maker: async_sessionmaker[AsyncSession],
+    ttl: timedelta,
+    interval: float,
+    batch_size: int,
+    release_expired: Callable[..., Awaitable[int]] = reap_expired_leases,
+) -> None:
+    while True:
+        try:
+            released = await release_expired(session_maker, ttl, batch_size)
+            if released:
+                logger.info("Released %d expired leases", released)
+        except Exception:
+            logger.exception("Lease reaper run failed")
+        await asyncio.sleep(interval)
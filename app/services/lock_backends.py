@@ -0,0 +1,344 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from uuid import UUID
+
+import asyncpg
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.schemas.user import UserRead
+from app.services.lease_audit import lease_audit
+from app.services.lease_reaper import reap_expired_leases
+from app.services.lock_notifier import RELEASED_CHANNEL, lock_notifier, released_payload
+from app.services.user_dao import LeaseQuotaExceeded, UserDAO
+
+logger = logging.getLogger(__name__)
+
+CLAIM_SCAN_PAGE_SIZE = 100
+
+
+def _leased(user, locktime: datetime | None) -> UserRead:
+    return UserRead.model_validate(user).model_copy(update={"locktime": locktime})
+
+
+def may_change_lease(holder: UUID | None, lessee: UUID | None) -> bool:
+    # Leases taken without a project stay open to every caller.
+    return holder is None or holder == lessee
+
+
+class LockBackend(ABC):
+    # Decides who holds a user's lease; rows in users stay the catalogue.
+    # Methods take the caller's DAO and return the user as the client should
+    # see it, or None when the lease could not be taken or changed. `lessee`
+    # is the project taking the lease; single acquires raise
+    # LeaseQuotaExceeded when it is at its quota, batches stop short.
+    # Release and renew only touch leases `lessee` may change (see
+    # may_change_lease). Batch operations fall back to one call per user.
+
+    name: str
+    # Detail reported when release or renew finds no lease it may change.
+    unlocked_detail = "User is not locked"
+    # Whether users.locktime shows the lease, so it can be read or filtered.
+    stores_locktime = False
+
+    async def start(self, dsn: str) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    @abstractmethod
+    async def acquire(self, dao: UserDAO, user, lessee=None): ...
+
+    @abstractmethod
+    def holder(self, user) -> UUID | None: ...
+
+    @abstractmethod
+    async def release(self, dao: UserDAO, user, lessee=None): ...
+
+    @abstractmethod
+    async def renew(self, dao: UserDAO, user, lessee=None): ...
+
+    @abstractmethod
+    async def claim(self, dao: UserDAO, lessee=None, **filter_by): ...
+
+    @abstractmethod
+    async def release_expired(
+        self,
+        session_maker: async_sessionmaker[AsyncSession],
+        ttl: timedelta,
+        batch_size: int,
+    ) -> int: ...
+
+    async def acquire_many(self, dao: UserDAO, user_ids, lessee=None):
+        results = []
+        for user in await dao.get_many(user_ids, primary=True):
+            try:
+                results.append(await self.acquire(dao, user, lessee))
+            except LeaseQuotaExceeded:
+                break
+        return [user for user in results if user is not None]
+
+    async def release_many(self, dao: UserDAO, user_ids, lessee=None):
+        users = await dao.get_many(user_ids, primary=True)
+        results = [await self.release(dao, user, lessee) for user in users]
+        return [user for user in results if user is not None]
+
+    async def claim_many(self, dao: UserDAO, count: int, lessee=None, **filter_by):
+        users = []
+        while len(users) < count:
+            try:
+                user = await self.claim(dao, lessee, **filter_by)
+            except LeaseQuotaExceeded:
+                break
+            if user is None:
+                break
+            users.append(user)
+        return users
+
+
+class LocktimeLockBackend(LockBackend):
+    # Leases live in users.locktime; every transition is a row UPDATE.
+    name = "locktime"
+    stores_locktime = True
+
+    async def acquire(self, dao: UserDAO, user, lessee=None):
+        return await dao.acquire_lock(user.id, lessee, project_id=user.project_id)
+
+    def holder(self, user) -> UUID | None:
+        return user.lessee_project_id
+
+    async def release(self, dao: UserDAO, user, lessee=None):
+        return await dao.release_lock(user.id, project_id=user.project_id, lessee=lessee)
+
+    async def renew(self, dao: UserDAO, user, lessee=None):
+        return await dao.renew_lock(user.id, project_id=user.project_id, lessee=lessee)
+
+    async def claim(self, dao: UserDAO, lessee=None, **filter_by):
+        return await dao.claim_free(lessee, **filter_by)
+
+    async def acquire_many(self, dao: UserDAO, user_ids, lessee=None):
+        return await dao.acquire_many(user_ids, lessee)
+
+    async def release_many(self, dao: UserDAO, user_ids, lessee=None):
+        return await dao.release_many(user_ids, lessee)
+
+    async def claim_many(self, dao: UserDAO, count: int, lessee=None, **filter_by):
+        return await dao.claim_many(count, lessee, **filter_by)
+
+    async def release_expired(self, session_maker, ttl, batch_size) -> int:
+        return await reap_expired_leases(session_maker, ttl, batch_size)
+
+
+class _TrackedLockBackend(LockBackend):
+    # Leases are tracked in this process: user id -> (lock time, payload
+    # announced to waiters on release, lessee). Nothing is written to users,
+    # so quotas are counted here; check_lock_backend keeps these backends to
+    # a single worker.
+
+    unlocked_detail = "User is not locked by this worker"
+
+    def __init__(self, claim_scan_limit: int):
+        self.claim_scan_limit = claim_scan_limit
+        self._held: dict[UUID, tuple[datetime, str, UUID | None]] = {}
+        self._leases: Counter = Counter()
+
+    @abstractmethod
+    async def _try_lock(self, user_id: UUID) -> bool: ...
+
+    @abstractmethod
+    async def _unlock(self, user_id: UUID, payload: str) -> None: ...
+
+    def _reserve(self, user, lessee) -> datetime:
+        quota = get_settings().lease_quota(lessee)
+        if quota is not None and self._leases[lessee] >= quota:
+            raise LeaseQuotaExceeded(lessee)
+        locktime = datetime.now(timezone.utc)
+        self._held[user.id] = (locktime, released_payload(user), lessee)
+        self._leases[lessee] += 1
+        return locktime
+
+    def _drop(self, user_id: UUID) -> str:
+        _, payload, lessee = self._held.pop(user_id)
+        self._leases[lessee] -= 1
+        if not self._leases[lessee]:
+            del self._leases[lessee]
+        return payload
+
+    async def acquire(self, dao: UserDAO, user, lessee=None):
+        if user.id in self._held:
+            return None
+        # Reserve before awaiting: advisory locks are re-entrant within a
+        # connection, so a concurrent acquire must be stopped here.
+        locktime = self._reserve(user, lessee)
+        reserved = self._held[user.id]
+        try:
+            locked = await self._try_lock(user.id)
+        except BaseException:
+            if self._held.get(user.id) is reserved:
+                self._drop(user.id)
+            raise
+        if self._held.get(user.id) is not reserved:
+            # A lost connection dropped the reservation while locking; give
+            # back the lock the new connection took for it.
+            if locked:
+                await self._unlock(user.id, reserved[1])
+            return None
+        if not locked:
+            self._drop(user.id)
+            return None
+        return _leased(user, locktime)
+
+    def holder(self, user) -> UUID | None:
+        held = self._held.get(user.id)
+        return held[2] if held is not None else None
+
+    async def release(self, dao: UserDAO, user, lessee=None):
+        # A lease this process does not hold was never taken here or has
+        # already ended; reporting a release would claim an unlock that did
+        # not happen.
+        held = self._held.get(user.id)
+        if held is None or not may_change_lease(held[2], lessee):
+            return None
+        await self._unlock(user.id, self._drop(user.id))
+        return _leased(user, None)
+
+    async def renew(self, dao: UserDAO, user, lessee=None):
+        held = self._held.get(user.id)
+        if held is None or not may_change_lease(held[2], lessee):
+            return None
+        locktime = datetime.now(timezone.utc)
+        self._held[user.id] = (locktime, *held[1:])
+        return _leased(user, locktime)
+
+    async def claim(self, dao: UserDAO, lessee=None, **filter_by):
+        # Candidates come from the catalogue in key order; leases held here
+        # are skipped without a round trip.
+        after = None
+        scanned = 0
+        while scanned < self.claim_scan_limit:
+            users = await dao.find_page(CLAIM_SCAN_PAGE_SIZE, after, locked=False, **filter_by)
+            for user in users:
+                leased = await self.acquire(dao, user, lessee)
+                if leased is not None:
+                    return leased
+            if len(users) < CLAIM_SCAN_PAGE_SIZE:
+                return None
+            scanned += len(users)
+            after = (users[-1].created_at, users[-1].id)
+        return None
+
+    async def release_expired(self, session_maker, ttl, batch_size) -> int:
+        deadline = datetime.now(timezone.utc) - ttl
+        expired = [
+            user_id for user_id, (locktime, *_) in self._held.items() if locktime < deadline
+        ]
+        for user_id in expired:
+            await self._unlock(user_id, self._drop(user_id))
+            lease_audit.record("expire", user_id)
+        return len(expired)
+
+
+class MemoryLockBackend(_TrackedLockBackend):
+    # Single-node lease manager: no database work per transition.
+    name = "memory"
+
+    async def _try_lock(self, user_id: UUID) -> bool:
+        return True
+
+    async def _unlock(self, user_id: UUID, payload: str) -> None:
+        lock_notifier.wake(payload)
+
+
+def advisory_key(user_id: UUID) -> int:
+    return int.from_bytes(user_id.bytes[:8], "big", signed=True)
+
+
+class AdvisoryLockBackend(_TrackedLockBackend):
+    # Session-level pg_try_advisory_lock on one dedicated connection. Advisory
+    # locks produce no WAL or dead tuples, but they belong to the connection
+    # that took them: a lease must be released by the process that acquired
+    # it, and all of a process's leases drop if its connection does. When
+    # that happens the leases are forgotten here too and the next call
+    # reconnects.
+    name = "advisory"
+
+    def __init__(self, claim_scan_limit: int):
+        super().__init__(claim_scan_limit)
+        self._dsn: str | None = None
+        self._connection: asyncpg.Connection | None = None
+        self._lock = asyncio.Lock()
+
+    async def start(self, dsn: str) -> None:
+        self._dsn = dsn
+        await self._connect()
+
+    async def stop(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is not None:
+            await connection.close()
+        self._held.clear()
+        self._leases.clear()
+
+    async def _connect(self) -> None:
+        connection = await asyncpg.connect(self._dsn)
+        connection.add_termination_listener(self._on_terminated)
+        self._connection = connection
+
+    def _on_terminated(self, connection: asyncpg.Connection) -> None:
+        if connection is not self._connection:
+            return
+        # Postgres released every session lock with the connection, so the
+        # users may already be leased by another worker.
+        logger.warning("Advisory lock connection lost; dropping %d leases", len(self._held))
+        self._connection = None
+        self._held.clear()
+        self._leases.clear()
+
+    async def _fetchval(self, query: str, *args):
+        async with self._lock:
+            if self._connection is not None and self._connection.is_closed():
+                self._on_terminated(self._connection)
+            if self._connection is None:
+                await self._connect()
+            return await self._connection.fetchval(query, *args)
+
+    async def _try_lock(self, user_id: UUID) -> bool:
+        return await self._fetchval("SELECT pg_try_advisory_lock($1)", advisory_key(user_id))
+
+    async def _unlock(self, user_id: UUID, payload: str) -> None:
+        await self._fetchval(
+            "SELECT pg_advisory_unlock($1), pg_notify($2, $3)",
+            advisory_key(user_id),
+            RELEASED_CHANNEL,
+            payload,
+        )
+
+
+def check_lock_backend(name: str, workers: int) -> None:
+    # Memory leases exclude nothing outside their own process, so two
+    # workers would hand out the same user at once. Advisory leases exclude
+    # each other across workers but belong to the worker that took them: a
+    # release or renew reaching another worker could not end or extend them.
+    if name in ("memory", "advisory") and workers > 1:
+        raise ValueError(f"LOCK_BACKEND={name} supports a single worker only")
+
+
+def create_lock_backend(name: str) -> LockBackend:
+    settings = get_settings()
+    if name == "advisory":
+        check_lock_backend(name, settings.WEB_WORKERS)
+        return AdvisoryLockBackend(settings.LOCK_CLAIM_SCAN_LIMIT)
+    if name == "memory":
+        check_lock_backend(name, settings.WEB_WORKERS)
+        return MemoryLockBackend(settings.LOCK_CLAIM_SCAN_LIMIT)
+    return LocktimeLockBackend()
+
+
+@lru_cache
+def get_lock_backend() -> LockBackend:
+    return create_lock_backend(get_settings().LOCK_BACKEND)
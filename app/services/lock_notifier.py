@@ -0,0 +1,149 @@
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+
+import asyncpg
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+RELEASED_CHANNEL = "users_released"
+
+T = TypeVar("T")
+
+
+def released_payload(user) -> str:
+    return json.dumps(
+        {
+            "id": str(user.id),
+            "project_id": str(user.project_id),
+            "env": user.env,
+            "domain": user.domain,
+        }
+    )
+
+
+class _Waiter:
+    __slots__ = ("event", "filter_by", "tenant", "handoff")
+
+    def __init__(self, filter_by: dict[str, str], tenant: Any):
+        self.event = asyncio.Event()
+        self.filter_by = filter_by
+        self.tenant = tenant
+        # (payload, waiters already offered it) for a release handed to this
+        # waiter that it has not tried yet.
+        self.handoff: tuple[str, set] | None = None
+
+
+class LockNotifier:
+    # Each release is handed to one waiting request at a time. Tenants take
+    # turns by smooth weighted round-robin, oldest waiter first within a
+    # tenant; a waiter that fails to take the user passes the release on.
+    def __init__(self, poll_interval: float = 1.0, weight: Callable[[Any], int] = lambda _: 1):
+        self.poll_interval = poll_interval
+        self.weight = weight
+        self._connection: asyncpg.Connection | None = None
+        self._waiters: dict[asyncio.Event, _Waiter] = {}
+        self._credit: dict[Any, int] = {}
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self, dsn: str) -> None:
+        self._connection = await asyncpg.connect(dsn)
+        await self._connection.add_listener(RELEASED_CHANNEL, self._on_released)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    def _on_released(self, connection, pid, channel, payload: str) -> None:
+        self.wake(payload)
+
+    def wake(self, payload: str) -> None:
+        self._hand_off(payload, set())
+
+    def _hand_off(self, payload: str, offered: set) -> None:
+        released = json.loads(payload)
+        candidates: dict[Any, _Waiter] = {}
+        for waiter in self._waiters.values():
+            if waiter in offered or waiter.handoff is not None:
+                continue
+            if all(released.get(key) == value for key, value in waiter.filter_by.items()):
+                candidates.setdefault(waiter.tenant, waiter)
+        if not candidates:
+            return
+        waiter = candidates[self._next_tenant(candidates)]
+        offered.add(waiter)
+        waiter.handoff = (payload, offered)
+        waiter.event.set()
+
+    def _next_tenant(self, tenants) -> Any:
+        total = 0
+        chosen = None
+        for tenant in tenants:
+            weight = self.weight(tenant)
+            self._credit[tenant] = self._credit.get(tenant, 0) + weight
+            total += weight
+            if chosen is None or self._credit[tenant] > self._credit[chosen]:
+                chosen = tenant
+        self._credit[chosen] -= total
+        return chosen
+
+    @contextmanager
+    def subscribe(self, tenant: Any = None, **filter_by: Any) -> Iterator[_Waiter]:
+        waiter = _Waiter({key: str(value) for key, value in filter_by.items()}, tenant)
+        self._waiters[waiter.event] = waiter
+        try:
+            yield waiter
+        finally:
+            del self._waiters[waiter.event]
+            if not any(other.tenant == tenant for other in self._waiters.values()):
+                self._credit.pop(tenant, None)
+            if waiter.handoff is not None:
+                self._hand_off(*waiter.handoff)
+
+    async def acquire_with_wait(
+        self,
+        acquire: Callable[[], Awaitable[T | None]],
+        timeout: float,
+        tenant: Any = None,
+        **filter_by: Any,
+    ) -> T | None:
+        if timeout <= 0:
+            return await acquire()
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        with self.subscribe(tenant, **filter_by) as waiter:
+            while True:
+                # Clear before trying so a release that lands between a failed
+                # attempt and the wait below still wakes us up.
+                waiter.event.clear()
+                handoff, waiter.handoff = waiter.handoff, None
+                result = None
+                try:
+                    result = await acquire()
+                finally:
+                    if result is None and handoff is not None:
+                        self._hand_off(*handoff)
+                remaining = deadline - loop.time()
+                if result is not None or remaining <= 0:
+                    return result
+                if not self.listening:
+                    remaining = min(remaining, self.poll_interval)
+                try:
+                    await asyncio.wait_for(waiter.event.wait(), remaining)
+                except TimeoutError:
+                    pass
+
+
+lock_notifier = LockNotifier(
+    poll_interval=get_settings().LOCK_WAIT_POLL_INTERVAL_SECONDS,
+    weight=get_settings().lease_weight,
+)
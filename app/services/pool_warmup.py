@@ -0,0 +1,34 @@
+import asyncio
+from uuid import UUID
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.base_dao import UNIT_OF_WORK
+from app.services.user_dao import UserDAO
+
+# Matches no row, so warming the write statements changes nothing.
+_NIL_ID = UUID(int=0)
+
+
+async def _warm_connection(session_maker: async_sessionmaker[AsyncSession]) -> None:
+    async with session_maker() as session:
+        # Keep every statement in one transaction and roll it back at the end.
+        session.info[UNIT_OF_WORK] = True
+        dao = UserDAO(session)
+        await dao.get_by_id(_NIL_ID, primary=True)
+        await dao.get_by_id(_NIL_ID)
+        await dao.find_one(login="")
+        await dao.find_page_rows(1, project_id=_NIL_ID)
+        await dao.acquire_lock(_NIL_ID, project_id=_NIL_ID)
+        await dao.renew_lock(_NIL_ID, project_id=_NIL_ID)
+        await dao.release_lock(_NIL_ID, project_id=_NIL_ID)
+        await dao.claim_free(project_id=_NIL_ID, env="", domain="")
+        await session.rollback()
+
+
+async def warm_up_pool(
+    session_maker: async_sessionmaker[AsyncSession], connections: int
+) -> None:
+    # Concurrent sessions force the pool to open distinct connections; each
+    # one compiles the hot statements and prepares them on its connection.
+    await asyncio.gather(*(_warm_connection(session_maker) for _ in range(connections)))
@@ -1,8 +1,47 @@
-from sqlalchemy import update as sqlalchemy_update, func
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import (
+    bindparam,
+    cast,
+    func,
+    insert,
+    or_,
+    select,
+    text,
+    update as sqlalchemy_update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.base_dao import BaseDAO
+from app.core.config import get_settings
 from app.models.user import User
+from app.models.user_login import UserLogin
+from app.services.lock_notifier import RELEASED_CHANNEL, released_payload
+
+_NOTIFY_RELEASED = text(
+    "SELECT pg_notify(:channel, payload) "
+    "FROM unnest(CAST(:payloads AS text[])) AS payload"
+)
+
+# Quota locks use the two-key advisory lock form, which lives apart from the
+# single bigint keys used for user leases; together the two int4 keys carry
+# 64 bits of the project id.
+_LOCK_QUOTA = text("SELECT pg_advisory_xact_lock(:high, :low)")
+
+
+def _quota_lock_keys(project_id) -> dict:
+    return {
+        "high": int.from_bytes(project_id.bytes[:4], "big", signed=True),
+        "low": int.from_bytes(project_id.bytes[4:8], "big", signed=True),
+    }
+
+
+class LeaseQuotaExceeded(Exception):
+    def __init__(self, project_id):
+        super().__init__(f"Lease quota exceeded for project {project_id}")
+        self.project_id = project_id
 
 
 class UserDAO(BaseDAO):
@@ -11,26 +50,257 @@ class UserDAO(BaseDAO):
     def __init__(self, session: AsyncSession):
         super().__init__(session)
 
-    async def acquire_lock(self, user_id):
-        stmt = (
+    read_columns = (
+        User.id,
+        User.login,
+        User.project_id,
+        User.env,
+        User.domain,
+        User.locktime,
+        User.created_at,
+    )
+
+    @staticmethod
+    def _lock_state(locked):
+        if locked is None:
+            return ()
+        return (User.locktime.is_not(None) if locked else User.locktime.is_(None),)
+
+    async def find_page(self, limit: int, after=None, locked=None, **filter_by):
+        return await super().find_page(limit, after, self._lock_state(locked), **filter_by)
+
+    async def find_page_rows(self, limit: int, after=None, locked=None, **filter_by):
+        return await super().find_page_rows(
+            self.read_columns, limit, after, self._lock_state(locked), **filter_by
+        )
+
+    async def create_skipping_duplicates(self, rows):
+        # Logins are reserved in user_logins first; users is partitioned and
+        # cannot carry the unique index ON CONFLICT would need. The login
+        # trigger accepts the reservation made here for the same id.
+        rows = [{**row, "id": row.get("id") or uuid.uuid4()} for row in rows]
+        reserve = (
+            pg_insert(UserLogin)
+            .values([{"login": row["login"], "user_id": row["id"]} for row in rows])
+            .on_conflict_do_nothing(index_elements=[UserLogin.login])
+            .returning(UserLogin.user_id)
+        )
+        reserved = set((await self.session.execute(reserve)).scalars().all())
+        rows = [row for row in rows if row["id"] in reserved]
+        if not rows:
+            await self._commit()
+            return []
+        result = await self.session.execute(insert(User).values(rows).returning(User.login))
+        logins = result.scalars().all()
+        await self._commit()
+        return logins
+
+    @staticmethod
+    def _lock_stmt(*criteria):
+        # "fetch" takes the new values from RETURNING; the default evaluator
+        # leaves already-loaded users stale when the WHERE uses bind params.
+        # The lessee is cast so it is refreshed the same way instead of being
+        # copied from the unbound parameter.
+        return (
             sqlalchemy_update(User)
-            .where(User.id == user_id, User.locktime.is_(None))
-            .values(locktime=func.now())
+            .where(*criteria, User.locktime.is_(None))
+            .values(
+                locktime=func.now(),
+                lessee_project_id=cast(bindparam("lessee"), User.lessee_project_id.type),
+            )
             .returning(User)
+            .execution_options(synchronize_session="fetch")
         )
-        result = await self.session.execute(stmt)
-        user = result.scalar_one_or_none()
-        await self.session.commit()
-        return user
 
-    async def release_lock(self, user_id):
-        stmt = (
+    @staticmethod
+    def _release_stmt(*criteria):
+        # Releasing a free user changes nothing, and must neither report
+        # success nor wake waiters.
+        return (
             sqlalchemy_update(User)
-            .where(User.id == user_id)
-            .values(locktime=None)
+            .where(*criteria, User.locktime.is_not(None))
+            .values(locktime=None, lessee_project_id=None)
             .returning(User)
+            .execution_options(synchronize_session="fetch")
+        )
+
+    @staticmethod
+    def _held_by():
+        # Only the holding project may release or renew a lease; leases
+        # taken without a project stay open to every caller.
+        return or_(
+            User.lessee_project_id.is_(None),
+            User.lessee_project_id == bindparam("holder", type_=User.lessee_project_id.type),
+        )
+
+    @staticmethod
+    def _free_ids(limit, *criteria, ordered=False, **filter_by):
+        # SKIP LOCKED lets concurrent claimers pass over rows another
+        # transaction is already taking instead of queueing behind it.
+        stmt = (
+            select(User.id)
+            .filter_by(**filter_by)
+            .where(*criteria, User.locktime.is_(None))
+            .limit(limit)
+            .with_for_update(skip_locked=True)
         )
-        result = await self.session.execute(stmt)
+        # Postgres plans the scan of a pruned partition for its total cost
+        # and ignores the LIMIT, so an unordered pick bitmap-scans the whole
+        # pool. Asking for the free pool index order lets it stop at the
+        # first free rows; that order only exists once project_id is matched.
+        if ordered:
+            stmt = stmt.order_by(User.env, User.domain, User.id)
+        return stmt
+
+    @staticmethod
+    def _picked(ids):
+        # Materialised so LIMIT holds: as a semi-join the subquery can be
+        # rescanned, and each rescan skips rows the UPDATE already changed.
+        picked = ids.cte("picked").prefix_with("MATERIALIZED", dialect="postgresql")
+        return User.id.in_(select(picked.c.id))
+
+    @staticmethod
+    def _expired_ids(ttl: timedelta, limit):
+        return (
+            select(User.id)
+            .where(User.locktime < func.now() - ttl)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+    async def _execute_one(self, stmt, params=None):
+        result = await self.session.execute(stmt, params)
         user = result.scalar_one_or_none()
-        await self.session.commit()
+        await self._commit()
         return user
+
+    async def _execute_many(self, stmt, params=None):
+        result = await self.session.execute(stmt, params)
+        users = result.scalars().all()
+        await self._commit()
+        return users
+
+    async def _release(self, stmt, params=None):
+        result = await self.session.execute(stmt, params)
+        users = result.scalars().all()
+        if users:
+            # NOTIFY is delivered on commit, so waiters never see a release
+            # that was rolled back.
+            await self.session.execute(
+                _NOTIFY_RELEASED,
+                {"channel": RELEASED_CHANNEL, "payloads": [released_payload(u) for u in users]},
+            )
+        await self._commit()
+        return users
+
+    async def lease_allowance(self, lessee, wanted: int) -> int:
+        # How many of `wanted` leases the project may still take. The
+        # transaction-level lock serialises one project's acquires until
+        # commit, so concurrent requests cannot both pass the count.
+        quota = get_settings().lease_quota(lessee)
+        if quota is None:
+            return wanted
+        await self.session.execute(_LOCK_QUOTA, _quota_lock_keys(lessee))
+        stmt = self._cached(
+            "lease_count",
+            lambda: select(func.count())
+            .select_from(User)
+            .where(*self._match_params(("lessee_project_id",))),
+        )
+        held = await self.session.scalar(stmt, self._match_values({"lessee_project_id": lessee}))
+        return max(0, min(wanted, quota - held))
+
+    async def _check_quota(self, lessee) -> None:
+        if not await self.lease_allowance(lessee, 1):
+            await self._commit()
+            raise LeaseQuotaExceeded(lessee)
+
+    @staticmethod
+    def _user_key(user_id, project_id) -> dict:
+        # users is partitioned by project_id: matching it as well lets the
+        # statement touch one partition instead of probing all of them.
+        if project_id is None:
+            return {"id": user_id}
+        return {"id": user_id, "project_id": project_id}
+
+    async def acquire_lock(self, user_id, lessee=None, project_id=None):
+        await self._check_quota(lessee)
+        key = self._user_key(user_id, project_id)
+        stmt = self._cached(
+            ("acquire_lock", tuple(key)), lambda: self._lock_stmt(*self._match_params(tuple(key)))
+        )
+        params = {**self._match_values(key), "lessee": lessee}
+        return await self._execute_one(stmt, params)
+
+    async def acquire_many(self, user_ids, lessee=None):
+        allowance = await self.lease_allowance(lessee, len(user_ids))
+        if allowance < len(user_ids):
+            # Over quota: lock only as many of the requested users as allowed.
+            criteria = (self._picked(self._free_ids(allowance, User.id.in_(user_ids))),)
+        else:
+            criteria = (User.id.in_(user_ids),)
+        return await self._execute_many(self._lock_stmt(*criteria), {"lessee": lessee})
+
+    async def claim_free(self, lessee=None, **filter_by):
+        await self._check_quota(lessee)
+        names = tuple(sorted(filter_by))
+        # The UPDATE matches project_id too, so it is planned against the
+        # chosen user's partition only.
+        partition = ("project_id",) if "project_id" in filter_by else ()
+        stmt = self._cached(
+            ("claim_free", names),
+            lambda: self._lock_stmt(
+                User.id
+                == self._free_ids(
+                    1, *self._match_params(names), ordered=bool(partition)
+                ).scalar_subquery(),
+                *self._match_params(partition),
+            ),
+        )
+        params = {**self._match_values(filter_by), "lessee": lessee}
+        return await self._execute_one(stmt, params)
+
+    async def claim_many(self, count, lessee=None, **filter_by):
+        allowance = await self.lease_allowance(lessee, count)
+        by_project = "project_id" in filter_by
+        free_user_ids = self._free_ids(allowance, ordered=by_project, **filter_by)
+        criteria = [self._picked(free_user_ids)]
+        if by_project:
+            criteria.append(User.project_id == filter_by["project_id"])
+        return await self._execute_many(self._lock_stmt(*criteria), {"lessee": lessee})
+
+    async def release_lock(self, user_id, project_id=None, lessee=None):
+        key = self._user_key(user_id, project_id)
+        stmt = self._cached(
+            ("release_lock", tuple(key)),
+            lambda: self._release_stmt(*self._match_params(tuple(key)), self._held_by()),
+        )
+        users = await self._release(stmt, {**self._match_values(key), "holder": lessee})
+        return users[0] if users else None
+
+    async def release_many(self, user_ids, lessee=None):
+        return await self._release(
+            self._release_stmt(User.id.in_(user_ids), self._held_by()), {"holder": lessee}
+        )
+
+    async def renew_lock(self, user_id, project_id=None, lessee=None):
+        key = self._user_key(user_id, project_id)
+        stmt = self._cached(
+            ("renew_lock", tuple(key)),
+            lambda: (
+                sqlalchemy_update(User)
+                .where(
+                    *self._match_params(tuple(key)),
+                    User.locktime.is_not(None),
+                    self._held_by(),
+                )
+                .values(locktime=func.now())
+                .returning(User)
+                .execution_options(synchronize_session="fetch")
+            ),
+        )
+        return await self._execute_one(stmt, {**self._match_values(key), "holder": lessee})
+
+    async def release_expired(self, ttl: timedelta, limit: int):
+        expired_ids = self._expired_ids(ttl, limit)
+        return await self._release(self._release_stmt(self._picked(expired_ids)))
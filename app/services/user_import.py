@@ -0,0 +1,110 @@
+import asyncio
+import codecs
+import csv
+from typing import AsyncIterable, AsyncIterator, Literal
+
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hash_async
+from app.schemas.user import UserCreate, UserImportError, UserImportResult
+from app.services.user_dao import UserDAO
+
+ImportFormat = Literal["csv", "jsonl"]
+
+DUPLICATE_LOGIN_DETAIL = "User with this login already exists"
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer
+
+
+def _validation_detail(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    )
+
+
+async def parse_user_rows(
+    lines: AsyncIterable[str], fmt: ImportFormat
+) -> AsyncIterator[tuple[int, UserCreate | UserImportError]]:
+    header = None
+    row = 0
+    async for line in lines:
+        row += 1
+        line = line.rstrip("\r")
+        if not line.strip():
+            continue
+
+        try:
+            if fmt == "csv":
+                values = next(csv.reader([line]))
+                if header is None:
+                    header = [name.strip() for name in values]
+                    continue
+                user_in = UserCreate.model_validate(dict(zip(header, values)))
+            else:
+                user_in = UserCreate.model_validate_json(line)
+        except ValidationError as exc:
+            yield row, UserImportError(row=row, detail=_validation_detail(exc))
+            continue
+
+        yield row, user_in
+
+
+async def _import_chunk(
+    dao: UserDAO, chunk: list[tuple[int, UserCreate]], result: UserImportResult
+) -> None:
+    hashes = await asyncio.gather(
+        *(get_password_hash_async(user_in.password) for _, user_in in chunk)
+    )
+    rows = [
+        {**user_in.model_dump(exclude={"password"}), "password": hashed}
+        for (_, user_in), hashed in zip(chunk, hashes)
+    ]
+    created_logins = {login.lower() for login in await dao.create_skipping_duplicates(rows)}
+
+    for row, user_in in chunk:
+        login = user_in.login.lower()
+        if login in created_logins:
+            # Only the first occurrence of a login inside a chunk is inserted.
+            created_logins.remove(login)
+            result.created += 1
+        else:
+            result.errors.append(
+                UserImportError(row=row, login=user_in.login, detail=DUPLICATE_LOGIN_DETAIL)
+            )
+
+
+async def import_user_rows(
+    session: AsyncSession,
+    rows: AsyncIterable[tuple[int, UserCreate | UserImportError]],
+    chunk_size: int,
+) -> UserImportResult:
+    dao = UserDAO(session)
+    result = UserImportResult()
+    chunk: list[tuple[int, UserCreate]] = []
+
+    async for row, item in rows:
+        if isinstance(item, UserImportError):
+            result.errors.append(item)
+            continue
+        chunk.append((row, item))
+        if len(chunk) >= chunk_size:
+            await _import_chunk(dao, chunk, result)
+            chunk = []
+
+    if chunk:
+        await _import_chunk(dao, chunk, result)
+
+    return result
@@ -0,0 +1,43 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def _load(path: Path) -> dict:
+    results = json.loads(path.read_text())["results"]
+    return {
+        (result["scenario"], result["operation"], json.dumps(result["params"], sort_keys=True)): result
+        for result in results
+    }
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    args = parser.parse_args()
+
+    baseline = _load(args.baseline)
+    candidate = _load(args.candidate)
+
+    for key in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[key], candidate[key]
+        scenario, operation, params = key
+        print(
+            f"{scenario:>8} {operation:<14} {params}\n"
+            f"    rps {before['rps']} -> {after['rps']} ({_change(before['rps'], after['rps'])})"
+            f"  p50 {before['latency_ms']['p50']} -> {after['latency_ms']['p50']}ms"
+            f" ({_change(before['latency_ms']['p50'], after['latency_ms']['p50'])})"
+            f"  p99 {before['latency_ms']['p99']} -> {after['latency_ms']['p99']}ms"
+            f" ({_change(before['latency_ms']['p99'], after['latency_ms']['p99'])})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import platform
+import statistics
+import subprocess
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+
+@dataclass
+class Sample:
+    operation: str
+    outcome: str
+    seconds: float
+
+
+@dataclass
+class Result:
+    scenario: str
+    operation: str
+    params: dict
+    requests: int
+    seconds: float
+    rps: float
+    latency_ms: dict
+    outcomes: dict = field(default_factory=dict)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(
+    scenario: str, params: dict, samples: list[Sample], elapsed: float
+) -> list[Result]:
+    results = []
+    for operation in sorted({sample.operation for sample in samples}):
+        op_samples = [sample for sample in samples if sample.operation == operation]
+        latencies = [sample.seconds * 1000 for sample in op_samples]
+        results.append(
+            Result(
+                scenario=scenario,
+                operation=operation,
+                params=params,
+                requests=len(op_samples),
+                seconds=round(elapsed, 4),
+                rps=round(len(op_samples) / elapsed, 2) if elapsed else 0.0,
+                latency_ms={
+                    "p50": round(percentile(latencies, 50), 3),
+                    "p99": round(percentile(latencies, 99), 3),
+                    "mean": round(statistics.fmean(latencies), 3) if latencies else 0.0,
+                    "max": round(max(latencies, default=0.0), 3),
+                },
+                outcomes=dict(Counter(sample.outcome for sample in op_samples)),
+            )
+        )
+    return results
+
+
+async def run_workers(
+    concurrency: int,
+    total: int,
+    step: Callable[[int], Awaitable[list[Sample]]],
+) -> tuple[list[Sample], float]:
+    """Run ``step`` ``total`` times spread over ``concurrency`` workers."""
+    samples: list[Sample] = []
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        for index in counter:
+            samples.extend(await step(index))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return samples, time.perf_counter() - started
+
+
+async def timed(operation: str, call: Callable[[], Awaitable], outcome_of) -> tuple[Sample, object]:
+    started = time.perf_counter()
+    value = await call()
+    return Sample(operation, outcome_of(value), time.perf_counter() - started), value
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(path: Path, results: list[Result], args: dict) -> None:
+    payload = {
+        "meta": {
+            "revision": _git_revision(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "args": args,
+        },
+        "results": [asdict(result) for result in results],
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2, default=str))
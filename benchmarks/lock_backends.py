@@ -0,0 +1,109 @@
+"""Compare lock backends under contention, without the HTTP layer.
+
+Workers repeatedly pick a random user from a small pool, acquire its lease
+and release it again, so most attempts collide. Each backend runs the same
+workload; latency per operation and the WAL written during the run are
+reported.
+
+    python -m benchmarks.lock_backends --concurrency 50 --requests 5000 --pool-size 20
+"""
+
+import argparse
+import asyncio
+import random
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from app.core.config import get_settings
+from app.core.database import async_session_maker, dispose_engines, engine
+from app.core.security import get_password_hash
+from app.services.lock_backends import create_lock_backend
+from app.services.user_dao import UserDAO
+from benchmarks.harness import run_workers, summarize, timed, write_results
+from benchmarks.scenarios import BENCH_PASSWORD, seed_users
+
+BACKENDS = ("locktime", "advisory", "memory")
+
+
+async def _wal_lsn() -> str:
+    async with engine.connect() as conn:
+        return (await conn.execute(text("SELECT pg_current_wal_lsn()"))).scalar_one()
+
+
+async def _wal_bytes(since: str) -> int:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), CAST(:since AS pg_lsn))"),
+            {"since": since},
+        )
+        return int(result.scalar_one())
+
+
+def _outcome(user) -> str:
+    return "acquired" if user is not None else "conflict"
+
+
+async def _run_backend(name: str, users, args: argparse.Namespace):
+    backend = create_lock_backend(name)
+    await backend.start(get_settings().asyncpg_dsn())
+
+    async def step(_: int):
+        user = random.choice(users)
+        async with async_session_maker() as session:
+            dao = UserDAO(session)
+            sample, leased = await timed("acquire", lambda: backend.acquire(dao, user), _outcome)
+            samples = [sample]
+            if leased is not None:
+                release_sample, _ = await timed(
+                    "release", lambda: backend.release(dao, user), lambda _: "released"
+                )
+                samples.append(release_sample)
+        return samples
+
+    try:
+        since = await _wal_lsn()
+        samples, elapsed = await run_workers(args.concurrency, args.requests, step)
+        wal = await _wal_bytes(since)
+    finally:
+        await backend.stop()
+
+    params = {"backend": name, "concurrency": args.concurrency, "pool_size": args.pool_size}
+    return summarize("lock-backend", params, samples, elapsed), wal
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with async_session_maker() as session:
+        rows = await seed_users(args.pool_size, uuid4(), get_password_hash(BENCH_PASSWORD))
+        users = await UserDAO(session).get_many([row["id"] for row in rows], primary=True)
+
+    results = []
+    for name in args.backend:
+        backend_results, wal = await _run_backend(name, users, args)
+        for result in backend_results:
+            print(
+                f"{name:>9} {result.operation:<8} rps={result.rps} "
+                f"p50={result.latency_ms['p50']}ms p99={result.latency_ms['p99']}ms "
+                f"outcomes={result.outcomes}"
+            )
+        print(f"{name:>9} wal={wal}B")
+        results.extend(backend_results)
+
+    await dispose_engines()
+    write_results(args.output, results, {k: v for k, v in vars(args).items() if k != "output"})
+    print(f"Results written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.lock_backends")
+    parser.add_argument("--backend", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--output", type=Path, default=Path("bench-lock-backends.json"))
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
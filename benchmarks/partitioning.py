@@ -0,0 +1,308 @@
+"""Compare the users table unpartitioned and hash-partitioned by project_id.
+
+Both layouts are built in scratch schemas from the same generated rows and
+queried through the real UserDAO statements (search_path points the
+unqualified "users" at each schema in turn):
+
+- acquire / release: lock and release one user by id and project_id, the
+  path the lock routes take; on the partitioned table it touches one
+  partition.
+- acquire-by-id: the same lock matched by id alone, which has to probe
+  every partition's primary key.
+- claim: take the first free user of a project's pool, then release it.
+- vacuum: VACUUM ANALYZE of the whole plain table versus one partition.
+
+Each step runs in one unit of work that is rolled back, so commit latency
+does not drown out the difference in statement cost. Client-side latency
+still includes the ORM's CPU time, so the same statements are also run
+under EXPLAIN ANALYZE and the server's planning and execution times are
+reported. Seeding 10M rows takes
+a few minutes per layout; --keep leaves the schemas in place and a later run
+with the same --rows reuses them.
+
+    python -m benchmarks.partitioning --rows 10000000 --requests 20000
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.base_dao import UNIT_OF_WORK
+from app.core.config import get_async_db_url
+from app.core.database import create_session_maker
+from app.models.user import USER_PARTITIONS, User
+from app.services.user_dao import UserDAO
+from benchmarks.harness import run_workers, summarize, timed, write_results
+
+LAYOUTS = ("plain", "partitioned")
+DOMAINS = ("regular", "premium", "trial", "legacy")
+SAMPLE_SIZE = 10_000
+
+COLUMNS = """
+    id uuid NOT NULL,
+    login citext NOT NULL,
+    password varchar NOT NULL,
+    project_id uuid NOT NULL,
+    env varchar NOT NULL,
+    domain varchar NOT NULL,
+    locktime timestamptz,
+    lessee_project_id uuid,
+    created_at timestamptz NOT NULL DEFAULT now()
+"""
+
+INDEXES = (
+    "CREATE INDEX ix_users_project_id_env_domain ON users (project_id, env, domain)",
+    "CREATE INDEX ix_users_free_pool ON users (project_id, env, domain, id) "
+    "WHERE locktime IS NULL",
+    "CREATE INDEX ix_users_locktime ON users (locktime) WHERE locktime IS NOT NULL",
+    "CREATE INDEX ix_users_created_at_id ON users (created_at, id)",
+    "CREATE INDEX ix_users_lessee_project_id ON users (lessee_project_id) "
+    "WHERE lessee_project_id IS NOT NULL",
+)
+
+
+def _schema(layout: str) -> str:
+    return f"bench_{layout}"
+
+
+def _ddl(layout: str) -> list[str]:
+    if layout == "plain":
+        return [f"CREATE TABLE users ({COLUMNS})"]
+    return [
+        f"CREATE TABLE users ({COLUMNS}) PARTITION BY HASH (project_id)",
+        *(
+            f"CREATE TABLE users_p{remainder} PARTITION OF users "
+            f"FOR VALUES WITH (MODULUS {USER_PARTITIONS}, REMAINDER {remainder})"
+            for remainder in range(USER_PARTITIONS)
+        ),
+    ]
+
+
+def _keys(layout: str) -> list[str]:
+    if layout == "plain":
+        return [
+            "ALTER TABLE users ADD PRIMARY KEY (id)",
+            "CREATE UNIQUE INDEX ix_users_login ON users (login)",
+        ]
+    return [
+        "ALTER TABLE users ADD PRIMARY KEY (id, project_id)",
+        "CREATE INDEX ix_users_login ON users (login)",
+    ]
+
+
+async def _seed(engine, layout: str, args: argparse.Namespace) -> None:
+    schema = _schema(layout)
+    async with engine.begin() as conn:
+        exists = await conn.scalar(
+            text("SELECT to_regclass(:table) IS NOT NULL"), {"table": f"{schema}.users"}
+        )
+        if exists and await conn.scalar(text("SELECT count(*) FROM users")) == args.rows:
+            print(f"{layout:>11} reusing {args.rows} rows")
+            return
+        await conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+        await conn.execute(text(f"CREATE SCHEMA {schema}"))
+        for statement in _ddl(layout):
+            await conn.execute(text(statement))
+
+    # Users are spread evenly over projects, and over domains within each.
+    projects = [str(uuid4()) for _ in range(args.projects)]
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "INSERT INTO users (id, login, password, project_id, env, domain) "
+                "SELECT gen_random_uuid(), 'bench_' || g || '@example.com', 'hashed', "
+                "(CAST(:projects AS uuid[]))[1 + g % :count], 'bench', "
+                "(CAST(:domains AS text[]))[1 + (g / :count) % :domains_count] "
+                "FROM generate_series(1, :rows) AS g"
+            ),
+            {
+                "projects": projects,
+                "count": len(projects),
+                "domains": list(DOMAINS),
+                "domains_count": len(DOMAINS),
+                "rows": args.rows,
+            },
+        )
+        for statement in (*_keys(layout), *INDEXES):
+            await conn.execute(text(statement))
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.execute(text("ANALYZE users"))
+    print(f"{layout:>11} seeded {args.rows} rows in {time.perf_counter() - started:.1f}s")
+
+
+async def _sample(engine) -> list[tuple]:
+    async with engine.connect() as conn:
+        result = await conn.execute(
+            text(
+                "SELECT id, project_id, domain FROM users TABLESAMPLE SYSTEM (1) "
+                "WHERE locktime IS NULL LIMIT :limit"
+            ),
+            {"limit": SAMPLE_SIZE},
+        )
+        return [tuple(row) for row in result]
+
+
+async def _vacuum_seconds(engine, layout: str) -> float:
+    table = "users" if layout == "plain" else "users_p0"
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        started = time.perf_counter()
+        await conn.execute(text(f"VACUUM ANALYZE {table}"))
+        return time.perf_counter() - started
+
+
+SERVER_STATEMENTS = {
+    "get_by_id": lambda user_id, project_id, domain: select(User).where(User.id == user_id),
+    "acquire": lambda user_id, project_id, domain: UserDAO._lock_stmt(
+        User.id == user_id, User.project_id == project_id
+    ),
+    "acquire-by-id": lambda user_id, project_id, domain: UserDAO._lock_stmt(User.id == user_id),
+    "claim": lambda user_id, project_id, domain: UserDAO._lock_stmt(
+        User.id
+        == UserDAO._free_ids(
+            1, ordered=True, project_id=project_id, env="bench", domain=domain
+        ).scalar_subquery(),
+        User.project_id == project_id,
+    ),
+}
+
+
+async def _server_ms(engine, sample: list[tuple], calls: int) -> dict[str, dict]:
+    timings = {}
+    async with engine.connect() as conn:
+        for name, build in SERVER_STATEMENTS.items():
+            planning, execution = [], []
+            for key in sample[:calls]:
+                compiled = build(*key).compile(
+                    dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}
+                )
+                result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {compiled}")
+                (plan,) = result.scalar_one()
+                planning.append(plan["Planning Time"])
+                execution.append(plan["Execution Time"])
+            await conn.rollback()
+            timings[name] = {
+                "planning_ms": round(statistics.median(planning), 4),
+                "execution_ms": round(statistics.median(execution), 4),
+            }
+    return timings
+
+
+def _outcome(user) -> str:
+    return "ok" if user is not None else "miss"
+
+
+async def _run_layout(layout: str, args: argparse.Namespace):
+    engine = create_async_engine(
+        get_async_db_url(),
+        pool_size=args.concurrency,
+        connect_args={"server_settings": {"search_path": f"{_schema(layout)}, public"}},
+    )
+    try:
+        await _seed(engine, layout, args)
+        sample = await _sample(engine)
+        session_maker = create_session_maker(engine)
+
+        async def step(_: int):
+            user_id, project_id, domain = random.choice(sample)
+            async with session_maker() as session:
+                session.info[UNIT_OF_WORK] = True
+                dao = UserDAO(session)
+                samples = []
+                acquired, user = await timed(
+                    "acquire",
+                    lambda: dao.acquire_lock(user_id, project_id=project_id),
+                    _outcome,
+                )
+                samples.append(acquired)
+                if user is not None:
+                    released, _ = await timed(
+                        "release",
+                        lambda: dao.release_lock(user_id, project_id=project_id),
+                        _outcome,
+                    )
+                    samples.append(released)
+                by_id, user = await timed(
+                    "acquire-by-id", lambda: dao.acquire_lock(user_id), _outcome
+                )
+                samples.append(by_id)
+                if user is not None:
+                    await dao.release_lock(user_id, project_id=project_id)
+                claimed, user = await timed(
+                    "claim",
+                    lambda: dao.claim_free(project_id=project_id, env="bench", domain=domain),
+                    _outcome,
+                )
+                samples.append(claimed)
+                if user is not None:
+                    await dao.release_lock(user.id, project_id=project_id)
+                await session.rollback()
+            return samples
+
+        samples, elapsed = await run_workers(args.concurrency, args.requests, step)
+        server = await _server_ms(engine, sample, args.explain_calls)
+        vacuum = await _vacuum_seconds(engine, layout)
+        if not args.keep:
+            async with engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA {_schema(layout)} CASCADE"))
+    finally:
+        await engine.dispose()
+
+    params = {"layout": layout, "rows": args.rows, "concurrency": args.concurrency}
+    return summarize("partitioning", params, samples, elapsed), server, vacuum
+
+
+async def _run(args: argparse.Namespace) -> None:
+    results = []
+    server_ms: dict[str, dict] = {}
+    vacuum_seconds: dict[str, float] = {}
+    for layout in args.layout:
+        layout_results, server, vacuum = await _run_layout(layout, args)
+        for result in layout_results:
+            print(
+                f"{layout:>11} {result.operation:<13} rps={result.rps} "
+                f"p50={result.latency_ms['p50']}ms p99={result.latency_ms['p99']}ms "
+                f"outcomes={result.outcomes}"
+            )
+        table = "table" if layout == "plain" else "one partition"
+        for name, timing in server.items():
+            print(
+                f"{layout:>11} server {name:<13} planning={timing['planning_ms']}ms "
+                f"execution={timing['execution_ms']}ms"
+            )
+        print(f"{layout:>11} vacuum analyze of {table}: {vacuum:.2f}s")
+        results.extend(layout_results)
+        server_ms[layout] = server
+        vacuum_seconds[layout] = round(vacuum, 3)
+
+    meta = {k: v for k, v in vars(args).items() if k != "output"}
+    meta.update(server_ms=server_ms, vacuum_seconds=vacuum_seconds)
+    write_results(args.output, results, meta)
+    print(f"Results written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.partitioning")
+    parser.add_argument("--layout", nargs="+", choices=LAYOUTS, default=list(LAYOUTS))
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--projects", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--explain-calls", type=int, default=1000)
+    parser.add_argument("--keep", action="store_true")
+    parser.add_argument("--output", type=Path, default=Path("bench-partitioning.json"))
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
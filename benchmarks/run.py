@@ -0,0 +1,53 @@
+"""Benchmark the hot API paths against a local Postgres.
+
+The app runs in-process behind httpx's ASGI transport, so results measure the
+service and the database without network noise. Results are written as JSON;
+use ``python -m benchmarks.compare`` to diff two runs.
+
+    python -m benchmarks.run --scenario lock login list --output bench/HEAD.json
+"""
+
+import argparse
+import asyncio
+from pathlib import Path
+
+import httpx
+
+from app.main import app
+from benchmarks.harness import write_results
+from benchmarks.scenarios import SCENARIOS
+
+
+async def _run(args: argparse.Namespace) -> None:
+    results = []
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.scenario:
+                scenario_results = await SCENARIOS[name](client, args)
+                for result in scenario_results:
+                    print(
+                        f"{result.scenario:>8} {result.operation:<14} {result.params} "
+                        f"rps={result.rps} p50={result.latency_ms['p50']}ms "
+                        f"p99={result.latency_ms['p99']}ms outcomes={result.outcomes}"
+                    )
+                results.extend(scenario_results)
+
+    write_results(args.output, results, {k: v for k, v in vars(args).items() if k != "output"})
+    print(f"Results written to {args.output}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run")
+    parser.add_argument("--scenario", nargs="+", choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--pool-size", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--table-sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--output", type=Path, default=Path("bench-results.json"))
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import random
+from argparse import Namespace
+from uuid import UUID, uuid4
+
+import httpx
+
+from app.core.database import async_session_maker
+from app.core.security import get_password_hash
+from app.services.user_dao import UserDAO
+from benchmarks.harness import Result, run_workers, summarize, timed
+
+BENCH_PASSWORD = "benchmark-password"
+SEED_CHUNK_SIZE = 1000
+
+
+def _status(response: httpx.Response) -> str:
+    return str(response.status_code)
+
+
+async def seed_users(
+    count: int, project_id: UUID, password_hash: str, env: str = "bench"
+) -> list[dict]:
+    rows = []
+    async with async_session_maker() as session:
+        dao = UserDAO(session)
+        for start in range(0, count, SEED_CHUNK_SIZE):
+            chunk = [
+                {
+                    "id": uuid4(),
+                    "login": f"bench_{uuid4().hex}@example.com",
+                    "password": password_hash,
+                    "project_id": project_id,
+                    "env": env,
+                    "domain": "regular",
+                }
+                for _ in range(min(SEED_CHUNK_SIZE, count - start))
+            ]
+            await dao.create_skipping_duplicates(chunk)
+            rows.extend(chunk)
+    return rows
+
+
+async def authenticate(client: httpx.AsyncClient, user: dict) -> None:
+    response = await client.post(
+        "/api/v1/auth/login",
+        json={"login": user["login"], "password": BENCH_PASSWORD},
+    )
+    response.raise_for_status()
+
+
+async def lock_contention(client: httpx.AsyncClient, args: Namespace) -> list[Result]:
+    users = await seed_users(args.pool_size, uuid4(), get_password_hash(BENCH_PASSWORD))
+    await authenticate(client, users[0])
+    user_ids = [user["id"] for user in users]
+
+    async def step(_: int):
+        user_id = random.choice(user_ids)
+        sample, response = await timed(
+            "acquire-lock",
+            lambda: client.post(f"/api/v1/users/{user_id}/acquire-lock"),
+            _status,
+        )
+        samples = [sample]
+        if response.status_code == 200:
+            release_sample, _ = await timed(
+                "release-lock",
+                lambda: client.post(f"/api/v1/users/{user_id}/release-lock"),
+                _status,
+            )
+            samples.append(release_sample)
+        return samples
+
+    samples, elapsed = await run_workers(args.concurrency, args.requests, step)
+    params = {"concurrency": args.concurrency, "pool_size": args.pool_size}
+    return summarize("lock", params, samples, elapsed)
+
+
+async def login_throughput(client: httpx.AsyncClient, args: Namespace) -> list[Result]:
+    # The first round logs every user in once, so each request pays for the
+    # password KDF. The second round repeats the same logins and is served
+    # by the verified-credential cache.
+    users = await seed_users(args.requests, uuid4(), get_password_hash(BENCH_PASSWORD))
+    results = []
+
+    for operation in ("login", "login-cached"):
+
+        async def step(index: int, operation: str = operation):
+            payload = {"login": users[index]["login"], "password": BENCH_PASSWORD}
+            sample, _ = await timed(
+                operation, lambda: client.post("/api/v1/auth/login", json=payload), _status
+            )
+            return [sample]
+
+        samples, elapsed = await run_workers(args.concurrency, args.requests, step)
+        results.extend(
+            summarize("login", {"concurrency": args.concurrency}, samples, elapsed)
+        )
+
+    return results
+
+
+async def list_users(client: httpx.AsyncClient, args: Namespace) -> list[Result]:
+    project_id = uuid4()
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    seeded = 0
+    results = []
+
+    for table_size in sorted(args.table_sizes):
+        users = await seed_users(table_size - seeded, project_id, password_hash)
+        if not seeded:
+            await authenticate(client, users[0])
+        seeded = table_size
+
+        async def step(_: int):
+            sample, _ = await timed(
+                "list-users",
+                lambda: client.get(
+                    "/api/v1/users/",
+                    params={"project_id": str(project_id), "limit": args.page_size},
+                ),
+                _status,
+            )
+            return [sample]
+
+        samples, elapsed = await run_workers(args.concurrency, args.requests, step)
+        params = {
+            "concurrency": args.concurrency,
+            "table_size": table_size,
+            "page_size": args.page_size,
+        }
+        results.extend(summarize("list", params, samples, elapsed))
+
+    return results
+
+
+SCENARIOS = {
+    "lock": lock_contention,
+    "login": login_throughput,
+    "list": list_users,
+}
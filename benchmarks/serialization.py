@@ -0,0 +1,81 @@
+"""Compare the ORM and Core-row read paths for a large user page.
+
+Both paths fetch the same rows through the DAO and render the JSON body the
+list endpoint would return. CPU time and peak traced memory are reported per
+path; the best of ``--repeat`` timed runs is kept and memory is traced in
+one extra run.
+
+    python -m benchmarks.serialization --rows 100000
+"""
+
+import argparse
+import asyncio
+import time
+import tracemalloc
+from uuid import uuid4
+
+from app.core.database import async_session_maker, engine
+from app.core.security import get_password_hash
+from app.schemas.user import UserPage, user_page_adapter
+from app.services.user_dao import UserDAO
+from benchmarks.scenarios import BENCH_PASSWORD, seed_users
+
+
+async def _orm_page(dao: UserDAO, limit: int, project_id) -> bytes:
+    users = await dao.find_page(limit, project_id=project_id)
+    return UserPage(items=users, next_cursor=None).model_dump_json().encode()
+
+
+async def _rows_page(dao: UserDAO, limit: int, project_id) -> bytes:
+    rows = await dao.find_page_rows(limit, project_id=project_id)
+    return user_page_adapter.dump_json({"items": rows, "next_cursor": None})
+
+
+async def _timed(render, limit: int, project_id) -> tuple[float, float, int]:
+    async with async_session_maker() as session:
+        dao = UserDAO(session)
+        cpu_started = time.process_time()
+        wall_started = time.perf_counter()
+        body = await render(dao, limit, project_id)
+        return time.process_time() - cpu_started, time.perf_counter() - wall_started, len(body)
+
+
+async def _peak_memory(render, limit: int, project_id) -> float:
+    # Traced separately: tracemalloc slows allocation-heavy code down enough
+    # to distort the CPU numbers.
+    async with async_session_maker() as session:
+        dao = UserDAO(session)
+        tracemalloc.start()
+        try:
+            await render(dao, limit, project_id)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return peak / 2**20
+
+
+async def _run(args: argparse.Namespace) -> None:
+    project_id = uuid4()
+    await seed_users(args.rows, project_id, get_password_hash(BENCH_PASSWORD))
+
+    for name, render in (("orm", _orm_page), ("rows", _rows_page)):
+        runs = [await _timed(render, args.rows, project_id) for _ in range(args.repeat)]
+        cpu, wall, size = min(runs)
+        peak = await _peak_memory(render, args.rows, project_id)
+        print(
+            f"{name:>5} rows={args.rows} cpu={cpu:.3f}s wall={wall:.3f}s "
+            f"peak={peak:.1f}MiB body={size}B"
+        )
+
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.serialization")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Measure per-call CPU of the hot DAO statements, rebuilt versus cached.
+
+"rebuilt" constructs the statement on every call the way the DAO used to;
+"cached" goes through the DAO's prebuilt statements. Both run against the
+database inside one rolled-back transaction, and process CPU time per call is
+reported, so server-side execution time is excluded.
+
+    python -m benchmarks.statements --calls 5000
+"""
+
+import argparse
+import asyncio
+import time
+from uuid import uuid4
+
+from sqlalchemy import func, select, update
+
+from app.core.base_dao import UNIT_OF_WORK
+from app.core.database import async_session_maker, dispose_engines
+from app.models.user import User
+from app.services.user_dao import UserDAO
+
+
+async def _cpu_per_call(call, calls: int) -> float:
+    for _ in range(min(calls, 200)):
+        await call()
+    started = time.process_time()
+    for _ in range(calls):
+        await call()
+    return (time.process_time() - started) / calls * 1e6
+
+
+async def _run(args: argparse.Namespace) -> None:
+    async with async_session_maker() as session:
+        session.info[UNIT_OF_WORK] = True
+        dao = UserDAO(session)
+        user = await dao.create(
+            {
+                "login": f"bench_{uuid4().hex}@example.com",
+                "password": "hashed",
+                "project_id": uuid4(),
+                "env": "bench",
+                "domain": "regular",
+            }
+        )
+        user_id, login = user.id, user.login
+
+        async def execute(stmt, params=None):
+            # Mirror what the DAO does with the result so only statement
+            # construction differs between the two paths.
+            result = await session.execute(stmt, params)
+            result.scalars().first()
+            await session.flush()
+
+        operations = {
+            "get_by_id": (
+                lambda: execute(select(User).where(User.id == user_id)),
+                lambda: dao.get_by_id(user_id, primary=True),
+            ),
+            "find_one": (
+                lambda: execute(select(User).filter_by(login=login)),
+                lambda: dao.find_one(primary=True, login=login),
+            ),
+            "acquire_lock": (
+                lambda: execute(UserDAO._lock_stmt(User.id == user_id), {"lessee": None}),
+                lambda: dao.acquire_lock(user_id),
+            ),
+            "renew_lock": (
+                lambda: execute(
+                    update(User)
+                    .where(User.id == user_id, User.locktime.is_not(None), UserDAO._held_by())
+                    .values(locktime=func.now())
+                    .returning(User)
+                    .execution_options(synchronize_session="fetch"),
+                    {"holder": None},
+                ),
+                lambda: dao.renew_lock(user_id),
+            ),
+        }
+
+        for name, (rebuilt, cached) in operations.items():
+            before = await _cpu_per_call(rebuilt, args.calls)
+            after = await _cpu_per_call(cached, args.calls)
+            print(
+                f"{name:<13} rebuilt={before:8.1f}us cached={after:8.1f}us "
+                f"({(after - before) / before * 100:+.1f}%)"
+            )
+
+        await session.rollback()
+
+    await dispose_engines()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.statements")
+    parser.add_argument("--calls", type=int, default=5000)
+    asyncio.run(_run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""add free pool indexes
+
+Revision ID: 5ae9cbe9c1da
+Revises: ea7bd65b5459
+Create Date: 2026-10-18 11:32:04.518274
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5ae9cbe9c1da"
+down_revision: Union[str, Sequence[str], None] = "ea7bd65b5459"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_users_project_id_env_domain",
+        "users",
+        ["project_id", "env", "domain"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_users_free_pool",
+        "users",
+        ["project_id", "env", "domain"],
+        unique=False,
+        postgresql_where=sa.text("locktime IS NULL"),
+    )
+    op.create_index(
+        "ix_users_locktime",
+        "users",
+        ["locktime"],
+        unique=False,
+        postgresql_where=sa.text("locktime IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_users_created_at_id",
+        "users",
+        ["created_at", "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_created_at_id", table_name="users")
+    op.drop_index("ix_users_locktime", table_name="users")
+    op.drop_index("ix_users_free_pool", table_name="users")
+    op.drop_index("ix_users_project_id_env_domain", table_name="users")
@@ -0,0 +1,40 @@
+"""add lessee project id
+
+Revision ID: c7d2e4f81b36
+Revises: b41f7c2e9a10
+Create Date: 2026-10-18 16:05:41.203917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "c7d2e4f81b36"
+down_revision: Union[str, Sequence[str], None] = "b41f7c2e9a10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "users",
+        sa.Column("lessee_project_id", postgresql.UUID(as_uuid=True), nullable=True),
+    )
+    op.create_index(
+        "ix_users_lessee_project_id",
+        "users",
+        ["lessee_project_id"],
+        unique=False,
+        postgresql_where=sa.text("lessee_project_id IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_users_lessee_project_id", table_name="users")
+    op.drop_column("users", "lessee_project_id")
@@ -0,0 +1,202 @@
+"""partition users by project id
+
+Revision ID: e3a91c5d7f24
+Revises: c7d2e4f81b36
+Create Date: 2026-10-18 17:42:10.586314
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e3a91c5d7f24"
+down_revision: Union[str, Sequence[str], None] = "c7d2e4f81b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PARTITIONS = 16
+
+COLUMNS = "id, login, password, project_id, env, domain, locktime, lessee_project_id, created_at"
+
+CLAIM_LOGIN_FUNCTION = """
+CREATE OR REPLACE FUNCTION users_claim_login() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM user_logins WHERE login = OLD.login AND user_id = OLD.id;
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'UPDATE' THEN
+        IF OLD.login IS NOT DISTINCT FROM NEW.login THEN
+            RETURN NULL;
+        END IF;
+        DELETE FROM user_logins WHERE login = OLD.login AND user_id = OLD.id;
+    END IF;
+    INSERT INTO user_logins (login, user_id) VALUES (NEW.login, NEW.id)
+    ON CONFLICT (login) DO NOTHING;
+    IF FOUND THEN
+        RETURN NULL;
+    END IF;
+    IF NOT EXISTS (
+        SELECT 1 FROM user_logins WHERE login = NEW.login AND user_id = NEW.id
+    ) THEN
+        RAISE unique_violation USING
+            MESSAGE = format('duplicate login "%s"', NEW.login),
+            CONSTRAINT = 'user_logins_pkey';
+    END IF;
+    IF (SELECT count(*) FROM users WHERE id = NEW.id) > 1 THEN
+        RAISE unique_violation USING
+            MESSAGE = format('duplicate user id "%s"', NEW.id),
+            CONSTRAINT = 'user_logins_user_id_key';
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql
+"""
+
+
+def _users_table(name: str, *constraints, **kwargs) -> None:
+    op.create_table(
+        name,
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("login", postgresql.CITEXT(), nullable=False),
+        sa.Column("password", sa.String(), nullable=False),
+        sa.Column("project_id", sa.UUID(), nullable=False),
+        sa.Column("env", sa.String(), nullable=False),
+        sa.Column("domain", sa.String(), nullable=False),
+        sa.Column("locktime", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("lessee_project_id", sa.UUID(), nullable=True),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        *constraints,
+        **kwargs,
+    )
+
+
+def _users_indexes(partitioned: bool) -> None:
+    op.create_index("ix_users_login", "users", ["login"], unique=not partitioned)
+    op.create_index(
+        "ix_users_project_id_env_domain",
+        "users",
+        ["project_id", "env", "domain"],
+        unique=False,
+    )
+    # Partitioned, the free pool index also ends in id so claims can pick
+    # the first free user in id order.
+    op.create_index(
+        "ix_users_free_pool",
+        "users",
+        ["project_id", "env", "domain", *(["id"] if partitioned else [])],
+        unique=False,
+        postgresql_where=sa.text("locktime IS NULL"),
+    )
+    op.create_index(
+        "ix_users_locktime",
+        "users",
+        ["locktime"],
+        unique=False,
+        postgresql_where=sa.text("locktime IS NOT NULL"),
+    )
+    op.create_index(
+        "ix_users_created_at_id",
+        "users",
+        ["created_at", "id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_users_lessee_project_id",
+        "users",
+        ["lessee_project_id"],
+        unique=False,
+        postgresql_where=sa.text("lessee_project_id IS NOT NULL"),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rewrites the whole table under an exclusive lock: run it in a
+    # maintenance window. Rows are copied before the secondary indexes and
+    # the login trigger exist, so both are built in bulk afterwards.
+    op.create_table(
+        "user_logins",
+        sa.Column("login", postgresql.CITEXT(), nullable=False),
+        sa.Column("user_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("login"),
+        sa.UniqueConstraint("user_id"),
+    )
+    op.execute("INSERT INTO user_logins (login, user_id) SELECT login, id FROM users")
+
+    op.rename_table("users", "users_unpartitioned")
+    op.execute(
+        "ALTER TABLE users_unpartitioned RENAME CONSTRAINT users_pkey TO users_unpartitioned_pkey"
+    )
+    for index in (
+        "ix_users_login",
+        "ix_users_project_id_env_domain",
+        "ix_users_free_pool",
+        "ix_users_locktime",
+        "ix_users_created_at_id",
+        "ix_users_lessee_project_id",
+    ):
+        op.drop_index(index, table_name="users_unpartitioned")
+
+    _users_table(
+        "users",
+        sa.PrimaryKeyConstraint("id", "project_id"),
+        postgresql_partition_by="HASH (project_id)",
+    )
+    for remainder in range(PARTITIONS):
+        op.execute(
+            f"CREATE TABLE users_p{remainder} PARTITION OF users "
+            f"FOR VALUES WITH (MODULUS {PARTITIONS}, REMAINDER {remainder})"
+        )
+    op.execute(f"INSERT INTO users ({COLUMNS}) SELECT {COLUMNS} FROM users_unpartitioned")
+    op.drop_table("users_unpartitioned")
+
+    _users_indexes(partitioned=True)
+    op.execute(CLAIM_LOGIN_FUNCTION)
+    op.execute(
+        "CREATE TRIGGER users_claim_login "
+        "AFTER INSERT OR UPDATE OF login OR DELETE ON users "
+        "FOR EACH ROW EXECUTE FUNCTION users_claim_login()"
+    )
+    op.execute("ANALYZE users")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table("users", "users_partitioned")
+    op.execute(
+        "ALTER TABLE users_partitioned RENAME CONSTRAINT users_pkey TO users_partitioned_pkey"
+    )
+    for index in (
+        "ix_users_login",
+        "ix_users_project_id_env_domain",
+        "ix_users_free_pool",
+        "ix_users_locktime",
+        "ix_users_created_at_id",
+        "ix_users_lessee_project_id",
+    ):
+        op.drop_index(index, table_name="users_partitioned")
+
+    _users_table("users", sa.PrimaryKeyConstraint("id"))
+    op.execute(f"INSERT INTO users ({COLUMNS}) SELECT {COLUMNS} FROM users_partitioned")
+    # Dropping the parent drops its partitions and the trigger with it.
+    op.drop_table("users_partitioned")
+    op.execute("DROP FUNCTION users_claim_login()")
+    op.drop_table("user_logins")
+
+    _users_indexes(partitioned=False)
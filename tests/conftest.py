@@ -1,10 +1,12 @@
 import sys
 from pathlib import Path
+from uuid import UUID, uuid4
 
 ROOT_DIR = Path(__file__).resolve().parents[1]
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+import pytest
 import pytest_asyncio
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
@@ -15,6 +17,7 @@ from sqlalchemy.pool import NullPool
 
 from app.core.config import get_async_db_url
 from app.core.database import Base
+from app.services.user_dao import UserDAO
 
 TEST_DATABASE_URL = get_async_db_url()
 
@@ -39,4 +42,33 @@ async def prepare_database() -> None:
 @pytest_asyncio.fixture
 async def db_session() -> AsyncSession:
     async with TestSessionMaker() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+@pytest_asyncio.fixture
+async def session_maker() -> async_sessionmaker[AsyncSession]:
+    return TestSessionMaker
+
+
+@pytest.fixture
+def user_dict():
+    def make(login: str | None = None, project_id: UUID | None = None) -> dict:
+        return {
+            "login": login or f"user_{uuid4().hex}@example.com",
+            "password": "hashed",
+            "project_id": project_id or uuid4(),
+            "env": "stage",
+            "domain": "regular",
+        }
+
+    return make
+
+
+@pytest.fixture
+def create_users(user_dict):
+    # `count` users of one fresh project.
+    async def create(dao: UserDAO, count: int):
+        project_id = uuid4()
+        return await dao.create_many([user_dict(project_id=project_id) for _ in range(count)])
+
+    return create
@@ -0,0 +1,68 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, status
+
+from app.api.deps import admit_password_hashing
+from app.core.admission import AdmissionLimiter, AdmissionRejected, get_password_hash_limiter
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds_when_queue_is_full() -> None:
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=1, queue_timeout=5)
+
+    await limiter.acquire()
+    queued = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.stats()["waiting"] == 1
+
+    with pytest.raises(AdmissionRejected) as exc:
+        await limiter.acquire()
+    assert exc.value.reason == "queue_full"
+
+    limiter.release()
+    await queued
+    assert limiter.stats() == {
+        "max_concurrency": 1,
+        "max_queue": 1,
+        "active": 1,
+        "waiting": 0,
+        "rejected": 1,
+    }
+    limiter.release()
+
+
+@pytest.mark.asyncio
+async def test_limiter_gives_up_after_queue_timeout() -> None:
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=10, queue_timeout=0.05)
+
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejected) as exc:
+        await limiter.acquire()
+    limiter.release()
+
+    assert exc.value.reason == "timeout"
+    assert limiter.stats()["waiting"] == 0
+    assert limiter.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_dependency_returns_503_with_retry_after(monkeypatch) -> None:
+    limiter = AdmissionLimiter(max_concurrency=1, max_queue=0, queue_timeout=1)
+    monkeypatch.setattr("app.api.deps.get_password_hash_limiter", lambda: limiter)
+
+    admitted = admit_password_hashing()
+    await anext(admitted)
+
+    with pytest.raises(HTTPException) as exc:
+        await anext(admit_password_hashing())
+
+    assert exc.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert "Retry-After" in exc.value.headers
+
+    await admitted.aclose()
+    assert limiter.stats()["active"] == 0
+
+
+def test_password_hash_limiter_is_shared() -> None:
+    assert get_password_hash_limiter() is get_password_hash_limiter()
@@ -1,12 +1,16 @@
+from datetime import timedelta
+from http.cookies import SimpleCookie
 from uuid import uuid4
 
 import pytest
 from fastapi import HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.deps import get_token_claims
 from app.api.v1.auth import login_v1
 from app.api.v1.users import create_user
 from app.schemas.auth import LoginRequest
+from app.core.security import create_jwt_token
 from app.schemas.user import UserCreate
 
 
@@ -65,4 +69,36 @@ async def test_login_user_not_found(db_session: AsyncSession) -> None:
     with pytest.raises(HTTPException) as exc:
         await login_v1(payload, response=response, db=db_session)
 
-    assert exc.value.status_code == 401
\ No newline at end of file
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_token_claims_from_login_cookie(db_session: AsyncSession) -> None:
+    login = f"user_{uuid4().hex}@example.com"
+    password = "super-secret"
+    created = await create_user(_make_user_create(login, password), db=db_session)
+    response = Response()
+    await login_v1(LoginRequest(login=login, password=password), response=response, db=db_session)
+    cookie = SimpleCookie(response.headers["set-cookie"])
+
+    claims = await get_token_claims(access_token=cookie["access_token"].value)
+
+    assert claims["sub"] == str(created.id)
+    assert claims["type"] == "access"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "token",
+    [
+        None,
+        "not-a-token",
+        create_jwt_token({"sub": "1"}, expires_delta=timedelta(minutes=-1)),
+        create_jwt_token({"sub": "1"}, expires_delta=timedelta(minutes=5), token_type="refresh"),
+    ],
+)
+async def test_token_claims_rejects_missing_or_invalid_token(token: str | None) -> None:
+    with pytest.raises(HTTPException) as exc:
+        await get_token_claims(access_token=token)
+
+    assert exc.value.status_code == 401
@@ -1,8 +1,10 @@
 from uuid import uuid4
 
 import pytest
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
+from app.core.base_dao import _statements, unit_of_work
 from app.core.security import get_password_hash
 from app.services.user_dao import UserDAO
 
@@ -41,4 +43,117 @@ async def test_base_dao_crud(db_session: AsyncSession) -> None:
 
     await dao.delete(created.id)
     deleted = await dao.get_by_id(created.id)
-    assert deleted is None
\ No newline at end of file
+    assert deleted is None
+
+
+@pytest.mark.asyncio
+async def test_base_dao_bulk_operations(db_session: AsyncSession) -> None:
+    dao = UserDAO(db_session)
+
+    project_id = uuid4()
+    rows = [
+        {
+            "login": f"user_{uuid4().hex}@example.com",
+            "password": "hashed",
+            "project_id": project_id,
+            "env": "stage",
+            "domain": "regular",
+        }
+        for _ in range(3)
+    ]
+
+    created = await dao.create_many(rows)
+    assert [u.login for u in created] == [row["login"] for row in rows]
+    assert all(u.id is not None and u.created_at is not None for u in created)
+
+    ids = [u.id for u in created]
+    updated = await dao.update_many(ids[:2], {"env": "prod"})
+    assert {u.id for u in updated} == set(ids[:2])
+    assert all(u.env == "prod" for u in updated)
+
+    deleted = await dao.delete_many(ids)
+    assert set(deleted) == set(ids)
+    assert await dao.find_all(project_id=project_id) == []
+
+    assert await dao.create_many([]) == []
+    assert await dao.update_many([], {"env": "prod"}) == []
+    assert await dao.delete_many([]) == []
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_commits_once(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession], user_dict
+) -> None:
+    dao = UserDAO(db_session)
+
+    async with unit_of_work(db_session):
+        created = await dao.create(user_dict())
+        locked = await dao.acquire_lock(created.id)
+        assert locked is not None
+
+        async with session_maker() as other:
+            assert await UserDAO(other).get_by_id(created.id) is None
+
+    async with session_maker() as other:
+        stored = await UserDAO(other).get_by_id(created.id)
+        assert stored is not None
+        assert stored.locktime is not None
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_rolls_back_on_error(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession], user_dict
+) -> None:
+    dao = UserDAO(db_session)
+    values = user_dict()
+
+    with pytest.raises(RuntimeError):
+        async with unit_of_work(db_session):
+            await dao.create(values)
+            raise RuntimeError("boom")
+
+    async with session_maker() as other:
+        assert await UserDAO(other).find_one(login=values["login"]) is None
+
+
+@pytest.mark.asyncio
+async def test_failed_write_leaves_unit_of_work_to_the_caller(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession], user_dict
+) -> None:
+    dao = UserDAO(db_session)
+    values = user_dict()
+
+    with pytest.raises(IntegrityError):
+        async with unit_of_work(db_session):
+            await dao.create(values)
+            try:
+                await dao.create(user_dict(values["login"]))
+            finally:
+                # Still the caller's transaction: nothing was rolled back yet.
+                assert db_session.in_transaction()
+
+    async with session_maker() as other:
+        assert await UserDAO(other).find_one(login=values["login"]) is None
+
+
+@pytest.mark.asyncio
+async def test_hot_statements_are_built_once(db_session: AsyncSession, user_dict) -> None:
+    created = await UserDAO(db_session).create(user_dict())
+
+    await UserDAO(db_session).get_by_id(created.id)
+    await UserDAO(db_session).acquire_lock(created.id)
+    built = dict(_statements)
+
+    dao = UserDAO(db_session)
+    assert (await dao.get_by_id(created.id)).locktime is not None
+    assert await dao.acquire_lock(created.id) is None
+    assert all(_statements[key] is stmt for key, stmt in built.items())
+    assert len(_statements) == len(built)
+
+
+@pytest.mark.asyncio
+async def test_find_one_matches_null_values(db_session: AsyncSession, user_dict) -> None:
+    dao = UserDAO(db_session)
+    created = await dao.create(user_dict())
+
+    assert (await dao.find_one(login=created.login, locktime=None)).id == created.id
@@ -0,0 +1,116 @@
+
+import pytest
+from sqlalchemy import event, exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.base_dao import UNIT_OF_WORK
+from app.core.config import get_async_db_url, get_settings
+from app.core.database import (
+    InstrumentedQueuePool,
+    create_engine,
+    create_session_maker,
+    get_pool_stats,
+)
+from app.services.user_dao import UserDAO
+
+
+@pytest.mark.asyncio
+async def test_pool_stats_track_checkouts_and_timeouts() -> None:
+    engine = create_async_engine(
+        get_async_db_url(),
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.1,
+    )
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            busy = get_pool_stats(engine)
+
+            with pytest.raises(exc.TimeoutError):
+                async with engine.connect():
+                    pass
+
+        stats = get_pool_stats(engine)
+    finally:
+        await engine.dispose()
+
+    assert busy["checked_out"] == 1
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds_max"] >= 0
+
+
+@pytest.mark.asyncio
+async def test_replica_serves_marked_reads_only(user_dict) -> None:
+    primary = create_async_engine(get_async_db_url(), poolclass=NullPool)
+    replica = create_async_engine(get_async_db_url(), poolclass=NullPool)
+    replica_statements = []
+
+    @event.listens_for(replica.sync_engine, "before_cursor_execute")
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        replica_statements.append(statement.split(None, 1)[0].upper())
+
+    try:
+        async with create_session_maker(primary, replica)() as session:
+            session.info[UNIT_OF_WORK] = True
+            dao = UserDAO(session)
+            # Never committed: only the primary's connection can see the row,
+            # so a read that finds nothing went to the replica.
+            user = await dao.create(user_dict())
+            assert replica_statements == []
+
+            assert await dao.get_by_id(user.id) is None
+            assert await dao.find_one(login=user.login) is None
+            assert [p async for p in dao.stream_partitions(100, login=user.login)] == []
+            assert len(replica_statements) == 3
+
+            assert (await dao.get_by_id(user.id, primary=True)).id == user.id
+            assert await dao.acquire_lock(user.id) is not None
+            assert len(replica_statements) == 3
+            await session.rollback()
+    finally:
+        await primary.dispose()
+        await replica.dispose()
+
+    assert set(replica_statements) == {"SELECT"}
+
+
+@pytest.mark.asyncio
+async def test_primary_read_refreshes_rows_loaded_from_replica(session_maker, user_dict) -> None:
+    primary = create_async_engine(get_async_db_url(), poolclass=NullPool)
+    replica = create_async_engine(get_async_db_url(), poolclass=NullPool)
+    try:
+        async with create_session_maker(primary, replica)() as session:
+            dao = UserDAO(session)
+            user = await dao.create(user_dict())
+            assert (await dao.get_by_id(user.id)).env == "stage"
+
+            async with session_maker() as other:
+                await UserDAO(other).update(user.id, {"env": "marker"})
+
+            assert (await dao.get_by_id(user.id, primary=True)).env == "marker"
+            await dao.delete(user.id)
+    finally:
+        await primary.dispose()
+        await replica.dispose()
+
+
+@pytest.mark.asyncio
+async def test_pgbouncer_mode_names_statements_uniquely(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "DB_PGBOUNCER_TRANSACTION_MODE", True)
+    engine = create_engine(get_async_db_url())
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            result = await conn.execute(text("SELECT name FROM pg_prepared_statements"))
+            names = result.scalars().all()
+    finally:
+        await engine.dispose()
+
+    assert names
+    assert not any(name.startswith("__asyncpg_stmt_") for name in names)
+    assert len(set(names)) == len(names)
@@ -0,0 +1,106 @@
+import re
+from datetime import timedelta
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import User
+from app.services.user_dao import UserDAO
+
+
+async def _explain(session: AsyncSession, stmt) -> str:
+    compiled = stmt.compile(
+        dialect=postgresql.dialect(),
+        compile_kwargs={"literal_binds": True},
+    )
+    conn = await session.connection()
+    # Seq scans stay cheaper than any index on a small test table, so turn
+    # them off to check that the index is usable at all.
+    await conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    result = await conn.exec_driver_sql(f"EXPLAIN {compiled}")
+    plan = "\n".join(row[0] for row in result)
+    await session.rollback()
+    return plan
+
+
+async def _indexes_used(session: AsyncSession, plan: str) -> set[str]:
+    # users is partitioned, so plans name each partition's own index; map
+    # them back to the index declared on users.
+    names = re.findall(r" using (\w+)", plan)
+    result = await session.execute(
+        text(
+            "SELECT parent.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = inhrelid "
+            "JOIN pg_class parent ON parent.oid = inhparent "
+            "WHERE child.relname = ANY(:names)"
+        ),
+        {"names": names},
+    )
+    return set(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_claim_uses_free_pool_index(db_session: AsyncSession) -> None:
+    stmt = UserDAO._free_ids(
+        1, ordered=True, project_id=uuid4(), env="stage", domain="regular"
+    )
+
+    plan = await _explain(db_session, stmt)
+
+    assert "ix_users_free_pool" in await _indexes_used(db_session, plan)
+
+
+@pytest.mark.asyncio
+async def test_claim_by_project_uses_free_pool_index(db_session: AsyncSession) -> None:
+    stmt = UserDAO._free_ids(10, ordered=True, project_id=uuid4())
+
+    plan = await _explain(db_session, stmt)
+
+    assert "ix_users_free_pool" in await _indexes_used(db_session, plan)
+
+
+@pytest.mark.asyncio
+async def test_claim_by_project_stops_at_first_free_user(
+    db_session: AsyncSession, user_dict
+) -> None:
+    # Rows and statistics stay in this transaction; _explain rolls it back.
+    project_id = uuid4()
+    await db_session.execute(
+        insert(User), [user_dict(project_id=project_id) for _ in range(2000)]
+    )
+    await db_session.execute(text("ANALYZE users"))
+    stmt = UserDAO._free_ids(
+        1, ordered=True, project_id=project_id, env="stage", domain="regular"
+    )
+
+    # With a pool this large an unordered pick bitmap-scans all of it
+    # before LIMIT applies.
+    plan = await _explain(db_session, stmt)
+
+    assert "Bitmap" not in plan
+    assert "ix_users_free_pool" in await _indexes_used(db_session, plan)
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_use_locktime_index(db_session: AsyncSession) -> None:
+    stmt = UserDAO._expired_ids(timedelta(minutes=10), 100)
+
+    plan = await _explain(db_session, stmt)
+
+    assert "ix_users_locktime" in await _indexes_used(db_session, plan)
+
+
+@pytest.mark.asyncio
+async def test_lookups_by_project_touch_one_partition(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    claim = UserDAO._free_ids(1, project_id=project_id)
+    acquire = UserDAO._lock_stmt(
+        UserDAO.model.id == uuid4(), UserDAO.model.project_id == project_id
+    )
+
+    for stmt in (claim, acquire):
+        plan = await _explain(db_session, stmt)
+        assert len(set(re.findall(r" on (users_p\d+)", plan))) == 1
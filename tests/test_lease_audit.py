@@ -0,0 +1,99 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.base_dao import unit_of_work
+from app.models import LeaseEvent
+from app.services.lease_audit import LeaseAuditWriter
+
+
+async def _events(session_maker: async_sessionmaker[AsyncSession], user_id):
+    async with session_maker() as session:
+        result = await session.execute(
+            select(LeaseEvent).filter_by(user_id=user_id).order_by(LeaseEvent.id)
+        )
+        return result.scalars().all()
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_full_batches(session_maker) -> None:
+    writer = LeaseAuditWriter(max_queue=100, batch_size=3, flush_interval=60)
+    await writer.start(session_maker)
+    user_id = uuid4()
+    try:
+        for action in ("acquire", "renew", "release"):
+            writer.record(action, user_id, "tester")
+        for _ in range(50):
+            if writer.written == 3:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await writer.stop()
+
+    events = await _events(session_maker, user_id)
+    assert [e.action for e in events] == ["acquire", "renew", "release"]
+    assert {e.actor for e in events} == {"tester"}
+
+
+@pytest.mark.asyncio
+async def test_writer_flushes_partial_batch_after_interval(session_maker) -> None:
+    writer = LeaseAuditWriter(max_queue=100, batch_size=100, flush_interval=0.05)
+    await writer.start(session_maker)
+    user_id = uuid4()
+    try:
+        writer.record("claim", user_id)
+        await asyncio.sleep(0.3)
+        assert writer.written == 1
+    finally:
+        await writer.stop()
+
+    assert len(await _events(session_maker, user_id)) == 1
+
+
+@pytest.mark.asyncio
+async def test_writer_drops_when_queue_is_full_and_drains_on_stop(session_maker) -> None:
+    writer = LeaseAuditWriter(max_queue=2, batch_size=100, flush_interval=60)
+    await writer.start(session_maker)
+    user_id = uuid4()
+    for _ in range(5):
+        writer.record("acquire", user_id)
+    await writer.stop()
+
+    # The first event may already be held by the writer, freeing a queue slot.
+    assert writer.written + writer.dropped == 5
+    assert writer.dropped >= 2
+    assert len(await _events(session_maker, user_id)) == writer.written
+
+
+def test_writer_ignores_events_when_not_started() -> None:
+    writer = LeaseAuditWriter(max_queue=1, batch_size=1, flush_interval=1)
+    writer.record("acquire", uuid4())
+    assert writer.written == 0
+    assert writer.dropped == 0
+
+
+@pytest.mark.asyncio
+async def test_unit_of_work_events_are_recorded_only_after_commit(session_maker) -> None:
+    writer = LeaseAuditWriter(max_queue=100, batch_size=100, flush_interval=60)
+    await writer.start(session_maker)
+    user_id = uuid4()
+    try:
+        async with session_maker() as session:
+            with pytest.raises(RuntimeError):
+                async with unit_of_work(session):
+                    await session.execute(select(1))
+                    writer.record_after_commit(session, "release", [user_id])
+                    raise RuntimeError
+
+            async with unit_of_work(session):
+                await session.execute(select(1))
+                writer.record_after_commit(session, "renew", [user_id], "tester")
+                assert writer._queue.empty()
+    finally:
+        await writer.stop()
+
+    events = await _events(session_maker, user_id)
+    assert [(e.action, e.actor) for e in events] == [("renew", "tester")]
@@ -0,0 +1,104 @@
+import asyncio
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.services.lock_backends import MemoryLockBackend
+from app.services.user_dao import LeaseQuotaExceeded, UserDAO
+
+
+@pytest.fixture
+def quota(monkeypatch: pytest.MonkeyPatch):
+    def set_quota(limit: int) -> None:
+        monkeypatch.setattr(get_settings(), "LEASE_QUOTA_DEFAULT", limit)
+
+    return set_quota
+
+
+@pytest.mark.asyncio
+async def test_acquire_stops_at_project_quota(
+    quota, db_session: AsyncSession, create_users
+) -> None:
+    quota(2)
+    dao = UserDAO(db_session)
+    first, second, third = await create_users(dao, 3)
+    lessee = uuid4()
+
+    assert (await dao.acquire_lock(first.id, lessee)).lessee_project_id == lessee
+    assert await dao.acquire_lock(second.id, lessee) is not None
+    with pytest.raises(LeaseQuotaExceeded):
+        await dao.acquire_lock(third.id, lessee)
+
+    # Other projects and unscoped callers are not affected.
+    assert await dao.acquire_lock(third.id, uuid4()) is not None
+    assert (await dao.release_lock(first.id, lessee=lessee)).lessee_project_id is None
+    assert await dao.claim_free(lessee, project_id=first.project_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_by_quota(quota, db_session: AsyncSession, create_users) -> None:
+    quota(3)
+    dao = UserDAO(db_session)
+    users = await create_users(dao, 5)
+    lessee = uuid4()
+
+    assert len(await dao.acquire_many([u.id for u in users[:2]], lessee)) == 2
+    assert len(await dao.claim_many(5, lessee, project_id=users[0].project_id)) == 1
+    assert await dao.acquire_many([u.id for u in users], lessee) == []
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_respect_quota(
+    quota, db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession], create_users
+) -> None:
+    quota(3)
+    users = await create_users(UserDAO(db_session), 10)
+    lessee = uuid4()
+
+    async def claim():
+        async with session_maker() as session:
+            try:
+                return await UserDAO(session).claim_free(lessee, project_id=users[0].project_id)
+            except LeaseQuotaExceeded:
+                return None
+
+    claimed = await asyncio.gather(*(claim() for _ in range(10)))
+
+    assert len([user for user in claimed if user is not None]) == 3
+
+
+@pytest.mark.asyncio
+async def test_quota_locks_of_projects_sharing_a_prefix_are_independent(
+    quota, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    quota(3)
+    prefix = uuid4().bytes[:4]
+    first, second = (UUID(bytes=prefix + uuid4().bytes[4:]) for _ in range(2))
+
+    async with session_maker() as holding, session_maker() as other:
+        assert await UserDAO(holding).lease_allowance(first, 1) == 1
+        # The first project's lock is held until `holding` commits.
+        allowance = await asyncio.wait_for(UserDAO(other).lease_allowance(second, 1), 2)
+
+    assert allowance == 1
+
+
+@pytest.mark.asyncio
+async def test_tracked_backend_counts_quota_per_lessee(
+    quota, db_session: AsyncSession, create_users
+) -> None:
+    quota(1)
+    dao = UserDAO(db_session)
+    first, second = await create_users(dao, 2)
+    backend = MemoryLockBackend(claim_scan_limit=1000)
+    lessee = uuid4()
+
+    assert await backend.acquire(dao, first, lessee) is not None
+    with pytest.raises(LeaseQuotaExceeded):
+        await backend.acquire(dao, second, lessee)
+    assert await backend.claim_many(dao, 2, lessee, project_id=first.project_id) == []
+
+    await backend.release(dao, first, lessee)
+    assert await backend.acquire(dao, second, lessee) is not None
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.security import get_password_hash
+from app.models import LeaseEvent
+from app.services.lease_audit import lease_audit
+from app.services.lease_reaper import reap_expired_leases
+from app.services.user_dao import UserDAO
+
+
+async def _create_locked_user(dao: UserDAO, locktime: datetime):
+    user = await dao.create(
+        {
+            "login": f"user_{uuid4().hex}@example.com",
+            "password": get_password_hash("secret"),
+            "project_id": uuid4(),
+            "env": "stage",
+            "domain": "regular",
+        }
+    )
+    return await dao.update(user.id, {"locktime": locktime})
+
+
+@pytest.mark.asyncio
+async def test_reap_expired_leases_releases_only_expired(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    dao = UserDAO(db_session)
+    now = datetime.now(timezone.utc)
+    expired_id = (await _create_locked_user(dao, now - timedelta(hours=1))).id
+    active_id = (await _create_locked_user(dao, now)).id
+
+    released = await reap_expired_leases(
+        session_maker, ttl=timedelta(minutes=10), batch_size=1
+    )
+
+    assert released >= 1
+    db_session.expire_all()
+    assert (await dao.get_by_id(expired_id)).locktime is None
+    assert (await dao.get_by_id(active_id)).locktime is not None
+
+
+@pytest.mark.asyncio
+async def test_reap_expired_leases_records_expire_events(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    dao = UserDAO(db_session)
+    expired_id = (
+        await _create_locked_user(dao, datetime.now(timezone.utc) - timedelta(hours=1))
+    ).id
+
+    await lease_audit.start(session_maker)
+    try:
+        await reap_expired_leases(session_maker, ttl=timedelta(minutes=10), batch_size=100)
+    finally:
+        await lease_audit.stop()
+
+    events = await db_session.scalars(select(LeaseEvent).filter_by(user_id=expired_id))
+    assert [event.action for event in events] == ["expire"]
@@ -0,0 +1,171 @@
+import asyncio
+from datetime import timedelta
+from uuid import uuid4
+
+import asyncpg
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.services.lock_backends import (
+    AdvisoryLockBackend,
+    LockBackend,
+    LocktimeLockBackend,
+    MemoryLockBackend,
+    advisory_key,
+    create_lock_backend,
+)
+from app.services.user_dao import UserDAO
+
+
+@pytest_asyncio.fixture(params=["memory", "advisory"])
+async def backend(request):
+    backend = {"memory": MemoryLockBackend, "advisory": AdvisoryLockBackend}[request.param](
+        claim_scan_limit=1000
+    )
+    await backend.start(get_settings().asyncpg_dsn())
+    yield backend
+    await backend.stop()
+
+
+@pytest.mark.asyncio
+async def test_backend_lease_lifecycle(backend, db_session: AsyncSession, create_users) -> None:
+    dao = UserDAO(db_session)
+    (user,) = await create_users(dao, 1)
+
+    assert await backend.renew(dao, user) is None
+
+    leased = await backend.acquire(dao, user)
+    assert leased.id == user.id
+    assert leased.locktime is not None
+    assert await backend.acquire(dao, user) is None
+    assert (await backend.renew(dao, user)).locktime >= leased.locktime
+
+    released = await backend.release(dao, user)
+    assert released.locktime is None
+    assert await backend.release(dao, user) is None
+    assert await backend.acquire(dao, user) is not None
+    await backend.release(dao, user)
+
+    # Leases are not written to the row.
+    assert (await dao.get_by_id(user.id, primary=True)).locktime is None
+
+
+@pytest.mark.asyncio
+async def test_backend_lease_changes_only_for_its_holder(
+    backend, db_session: AsyncSession, create_users
+) -> None:
+    dao = UserDAO(db_session)
+    (user,) = await create_users(dao, 1)
+    holder = uuid4()
+
+    await backend.acquire(dao, user, holder)
+    assert backend.holder(user) == holder
+    assert await backend.renew(dao, user, uuid4()) is None
+    assert await backend.release(dao, user, uuid4()) is None
+
+    assert (await backend.release(dao, user, holder)).locktime is None
+    assert backend.holder(user) is None
+
+
+@pytest.mark.asyncio
+async def test_backend_claims_distinct_users(
+    backend, db_session: AsyncSession, create_users
+) -> None:
+    dao = UserDAO(db_session)
+    users = await create_users(dao, 3)
+    project_id = users[0].project_id
+
+    claimed = await backend.claim_many(dao, 5, project_id=project_id)
+
+    assert sorted(u.id for u in claimed) == sorted(u.id for u in users)
+    assert await backend.claim(dao, project_id=project_id) is None
+    assert len(await backend.release_many(dao, [u.id for u in users])) == 3
+
+
+@pytest.mark.asyncio
+async def test_backend_releases_expired_leases(
+    backend, db_session: AsyncSession, create_users
+) -> None:
+    dao = UserDAO(db_session)
+    (user,) = await create_users(dao, 1)
+    await backend.acquire(dao, user)
+
+    assert await backend.release_expired(None, timedelta(hours=1), 100) == 0
+    assert await backend.release_expired(None, timedelta(0), 100) == 1
+    assert await backend.acquire(dao, user) is not None
+    await backend.release(dao, user)
+
+
+@pytest.mark.asyncio
+async def test_advisory_lease_blocks_other_sessions(
+    db_session: AsyncSession, create_users
+) -> None:
+    dao = UserDAO(db_session)
+    (user,) = await create_users(dao, 1)
+    backend = AdvisoryLockBackend(claim_scan_limit=1000)
+    await backend.start(get_settings().asyncpg_dsn())
+    other = await asyncpg.connect(get_settings().asyncpg_dsn())
+    try:
+        await backend.acquire(dao, user)
+        assert not await other.fetchval("SELECT pg_try_advisory_lock($1)", advisory_key(user.id))
+
+        await backend.release(dao, user)
+        assert await other.fetchval("SELECT pg_try_advisory_lock($1)", advisory_key(user.id))
+    finally:
+        await other.close()
+        await backend.stop()
+
+
+@pytest.mark.asyncio
+async def test_advisory_backend_recovers_from_lost_connection(
+    db_session: AsyncSession, create_users
+) -> None:
+    dao = UserDAO(db_session)
+    first, second = await create_users(dao, 2)
+    backend = AdvisoryLockBackend(claim_scan_limit=1000)
+    await backend.start(get_settings().asyncpg_dsn())
+    other = await asyncpg.connect(get_settings().asyncpg_dsn())
+    try:
+        await backend.acquire(dao, first)
+        await other.execute("SELECT pg_terminate_backend($1)", backend._connection.get_server_pid())
+        for _ in range(50):
+            if backend._connection is None:
+                break
+            await asyncio.sleep(0.02)
+
+        # Postgres dropped the lock with the connection, and so did the backend.
+        assert await backend.release(dao, first) is None
+        assert await other.fetchval("SELECT pg_try_advisory_lock($1)", advisory_key(first.id))
+
+        assert await backend.acquire(dao, second) is not None
+        assert not await other.fetchval(
+            "SELECT pg_try_advisory_lock($1)", advisory_key(second.id)
+        )
+        await backend.release(dao, second)
+    finally:
+        await other.close()
+        await backend.stop()
+
+
+@pytest.mark.parametrize("name", ["memory", "advisory"])
+def test_process_backends_refuse_several_workers(
+    name: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "WEB_WORKERS", 2)
+
+    with pytest.raises(ValueError):
+        create_lock_backend(name)
+    assert isinstance(create_lock_backend("locktime"), LocktimeLockBackend)
+
+
+def test_incomplete_backend_fails_on_instantiation() -> None:
+    class AcquireOnly(LockBackend):
+        name = "acquire-only"
+
+        async def acquire(self, dao, user, lessee=None):
+            return None
+
+    with pytest.raises(TypeError):
+        AcquireOnly()
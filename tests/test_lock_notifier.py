@@ -0,0 +1,180 @@
+import asyncio
+import json
+from uuid import uuid4
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import get_settings
+from app.core.security import get_password_hash
+from app.services.lock_notifier import LockNotifier
+from app.services.user_dao import UserDAO
+
+
+@pytest_asyncio.fixture
+async def notifier() -> LockNotifier:
+    notifier = LockNotifier(poll_interval=30)
+    await notifier.start(get_settings().asyncpg_dsn())
+    yield notifier
+    await notifier.stop()
+
+
+async def _create_locked_user(session: AsyncSession):
+    dao = UserDAO(session)
+    user = await dao.create(
+        {
+            "login": f"user_{uuid4().hex}@example.com",
+            "password": get_password_hash("secret"),
+            "project_id": uuid4(),
+            "env": "stage",
+            "domain": "regular",
+        }
+    )
+    return await dao.acquire_lock(user.id)
+
+
+@pytest.mark.asyncio
+async def test_waiter_wakes_up_on_release(
+    db_session: AsyncSession,
+    session_maker: async_sessionmaker[AsyncSession],
+    notifier: LockNotifier,
+) -> None:
+    user = await _create_locked_user(db_session)
+
+    async def wait_for_claim():
+        async with session_maker() as session:
+            dao = UserDAO(session)
+            return await notifier.acquire_with_wait(
+                lambda: dao.claim_free(project_id=user.project_id),
+                timeout=10,
+                project_id=user.project_id,
+            )
+
+    waiter = asyncio.create_task(wait_for_claim())
+    await asyncio.sleep(0.2)
+    assert not waiter.done()
+
+    await UserDAO(db_session).release_lock(user.id)
+    claimed = await asyncio.wait_for(waiter, timeout=5)
+
+    assert claimed is not None
+    assert claimed.id == user.id
+
+
+@pytest.mark.asyncio
+async def test_waiter_ignores_other_pools(
+    db_session: AsyncSession,
+    session_maker: async_sessionmaker[AsyncSession],
+    notifier: LockNotifier,
+) -> None:
+    user = await _create_locked_user(db_session)
+    other_user = await _create_locked_user(db_session)
+    attempts = 0
+
+    async def acquire():
+        nonlocal attempts
+        attempts += 1
+        async with session_maker() as session:
+            return await UserDAO(session).claim_free(project_id=user.project_id)
+
+    waiter = asyncio.create_task(
+        notifier.acquire_with_wait(acquire, timeout=0.5, project_id=user.project_id)
+    )
+    await asyncio.sleep(0.1)
+    await UserDAO(db_session).release_lock(other_user.id)
+
+    assert await waiter is None
+    # One attempt up front and a last one at the deadline, none in between.
+    assert attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_acquire_with_wait_polls_without_listener(db_session: AsyncSession) -> None:
+    notifier = LockNotifier(poll_interval=0.05)
+    attempts = 0
+
+    async def acquire():
+        nonlocal attempts
+        attempts += 1
+        return "user" if attempts == 3 else None
+
+    assert await notifier.acquire_with_wait(acquire, timeout=1) == "user"
+    assert attempts == 3
+
+
+async def _wait_in_order(notifier: LockNotifier, tenants, acquire):
+    waiters = []
+    for tenant in tenants:
+        waiters.append(
+            asyncio.create_task(
+                notifier.acquire_with_wait(
+                    lambda tenant=tenant: acquire(tenant), timeout=5, tenant=tenant, env="stage"
+                )
+            )
+        )
+        await asyncio.sleep(0.01)
+    return waiters
+
+
+def _released(env: str = "stage") -> str:
+    return json.dumps({"id": str(uuid4()), "project_id": str(uuid4()), "env": env})
+
+
+@pytest.mark.asyncio
+async def test_releases_rotate_between_tenants() -> None:
+    notifier = LockNotifier(poll_interval=30)
+    free: list[str] = []
+    served: list[str] = []
+
+    async def acquire(tenant):
+        if not free:
+            return None
+        served.append(tenant)
+        return free.pop()
+
+    waiters = await _wait_in_order(notifier, ["big", "big", "big", "small"], acquire)
+    for _ in waiters:
+        free.append("user")
+        notifier.wake(_released())
+        await asyncio.sleep(0.01)
+    await asyncio.gather(*waiters)
+
+    # The small tenant is served second, not after every big waiter.
+    assert served == ["big", "small", "big", "big"]
+
+
+@pytest.mark.asyncio
+async def test_release_is_passed_on_when_waiter_cannot_take_it() -> None:
+    notifier = LockNotifier(poll_interval=30, weight=lambda tenant: {"a": 2}.get(tenant, 1))
+    free: list[str] = []
+
+    async def acquire(tenant):
+        # Tenant "a" is at its quota and never gets a user.
+        if tenant == "a" or not free:
+            return None
+        return free.pop()
+
+    stuck, waiting = await _wait_in_order(notifier, ["a", "b"], acquire)
+    free.append("user")
+    notifier.wake(_released())
+
+    assert await asyncio.wait_for(waiting, timeout=1) == "user"
+    stuck.cancel()
+
+
+@pytest.mark.asyncio
+async def test_release_wakes_no_one_outside_the_pool() -> None:
+    notifier = LockNotifier(poll_interval=30)
+    attempts = 0
+
+    async def acquire(tenant):
+        nonlocal attempts
+        attempts += 1
+
+    (waiter,) = await _wait_in_order(notifier, ["a"], acquire)
+    notifier.wake(_released(env="prod"))
+    await asyncio.sleep(0.05)
+
+    assert attempts == 1
+    waiter.cancel()
@@ -0,0 +1,179 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI, HTTPException, status
+from prometheus_client import REGISTRY
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.api.v1.users import acquire_lock, create_user
+from app.core.config import get_async_db_url
+from app.core.metrics import MetricsMiddleware, StatsPublisher, instrument_engine
+from app.schemas.user import UserCreate
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.mark.asyncio
+async def test_middleware_records_route_template() -> None:
+    inner = FastAPI()
+
+    @inner.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    app = MetricsMiddleware(inner)
+    labels = {"method": "GET", "route": "/items/{item_id}", "status": "200"}
+    before = _sample("botferm_http_request_duration_seconds_count", **labels)
+
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/items/42",
+        "raw_path": b"/items/42",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "server": ("testserver", 80),
+        "client": ("testclient", 123),
+        "app": inner,
+    }
+    await app(scope, receive, send)
+
+    assert messages[0]["status"] == 200
+    assert _sample("botferm_http_request_duration_seconds_count", **labels) == before + 1
+    assert _sample("botferm_http_requests_in_flight", method="GET") == 0
+
+
+@pytest.mark.asyncio
+async def test_lock_operations_are_counted(db_session: AsyncSession) -> None:
+    created = await create_user(
+        UserCreate(
+            login=f"user_{uuid4().hex}@example.com",
+            password="secret-password",
+            project_id=uuid4(),
+            env="stage",
+            domain="regular",
+        ),
+        db=db_session,
+    )
+    success = _sample("botferm_lock_operations_total", operation="acquire", outcome="success")
+    conflict = _sample("botferm_lock_operations_total", operation="acquire", outcome="conflict")
+
+    await acquire_lock(created.id, db=db_session)
+    with pytest.raises(HTTPException) as exc:
+        await acquire_lock(created.id, db=db_session)
+
+    assert exc.value.status_code == status.HTTP_409_CONFLICT
+
+    assert _sample("botferm_lock_operations_total", operation="acquire", outcome="success") == success + 1
+    assert _sample("botferm_lock_operations_total", operation="acquire", outcome="conflict") == conflict + 1
+
+
+@pytest.mark.asyncio
+async def test_instrumented_engine_records_statement_timings() -> None:
+    engine = create_async_engine(get_async_db_url())
+    instrument_engine(engine)
+    before = _sample("botferm_db_statement_duration_seconds_count", statement="SELECT")
+    try:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    finally:
+        await engine.dispose()
+
+    assert _sample("botferm_db_statement_duration_seconds_count", statement="SELECT") >= before + 1
+
+
+def _pool_stats(checked_out: int, checkouts: int) -> dict:
+    return {
+        "size": 5,
+        "checked_in": 5 - checked_out,
+        "checked_out": checked_out,
+        "overflow": 0,
+        "checkouts": checkouts,
+        "timeouts": 0,
+        "wait_seconds_total": 0.0,
+    }
+
+
+def test_stats_publisher_sets_gauges_and_advances_counters() -> None:
+    stats = _pool_stats(checked_out=2, checkouts=10)
+    limiter = {"active": 1, "waiting": 3}
+    publisher = StatsPublisher(lambda: stats, {"test": lambda: limiter})
+    before = _sample("botferm_db_pool_checkouts_total")
+
+    publisher.publish()
+    stats.update(_pool_stats(checked_out=1, checkouts=15))
+    publisher.publish()
+
+    assert _sample("botferm_db_pool_checked_out") == 1
+    assert _sample("botferm_db_pool_checkouts_total") == before + 15
+    assert _sample("botferm_admission_waiting", limiter="test") == 3
+
+
+_WORKER = """
+import sys
+from app.core.metrics import StatsPublisher
+checked_out, checkouts = map(int, sys.argv[1:])
+stats = {"size": 5, "checked_in": 0, "checked_out": checked_out, "overflow": 0,
+         "checkouts": checkouts, "timeouts": 0, "wait_seconds_total": 0.0}
+StatsPublisher(lambda: stats, {}).publish()
+"""
+
+_SCRAPE = """
+import sys
+from prometheus_client import multiprocess
+from prometheus_client import generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+from app.core.metrics import metrics_registry
+for pid in sys.argv[1:]:
+    multiprocess.mark_process_dead(int(pid))
+for family in text_string_to_metric_families(generate_latest(metrics_registry()).decode()):
+    for sample in family.samples:
+        if sample.name in ("botferm_db_pool_checked_out", "botferm_db_pool_checkouts_total"):
+            print(sample.name, sample.value)
+"""
+
+
+def _python(code: str, *args, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", code, *map(str, args)],
+        cwd=Path(__file__).resolve().parents[1],
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def test_multiprocess_mode_merges_worker_metrics(tmp_path: Path) -> None:
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    workers = [_python(_WORKER, 2, 3, env=env), _python(_WORKER, 1, 4, env=env)]
+    assert [worker.wait() for worker in workers] == [0, 0]
+
+    def scrape(*dead_pids) -> dict[str, float]:
+        output, _ = _python(_SCRAPE, *dead_pids, env=env).communicate()
+        return {name: float(value) for name, value in map(str.split, output.splitlines())}
+
+    assert scrape() == {"botferm_db_pool_checked_out": 3, "botferm_db_pool_checkouts_total": 7}
+    # A stopped worker's live gauges drop out; what it counted stays.
+    assert scrape(workers[0].pid) == {
+        "botferm_db_pool_checked_out": 1,
+        "botferm_db_pool_checkouts_total": 7,
+    }
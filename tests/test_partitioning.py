@@ -0,0 +1,83 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import UserLogin
+from app.services.user_dao import UserDAO
+
+
+async def _login_owner(session: AsyncSession, login: str):
+    return await session.scalar(select(UserLogin.user_id).where(UserLogin.login == login))
+
+
+@pytest.mark.asyncio
+async def test_login_is_unique_across_partitions(db_session: AsyncSession, user_dict) -> None:
+    dao = UserDAO(db_session)
+    created = await dao.create(user_dict())
+    login, user_id = created.login, created.id
+
+    # A different project usually hashes to a different partition; the
+    # login must still be rejected.
+    with pytest.raises(IntegrityError):
+        await dao.create(user_dict(login))
+    await db_session.rollback()
+
+    assert await _login_owner(db_session, login) == user_id
+
+
+@pytest.mark.asyncio
+async def test_login_follows_updates_and_deletes(db_session: AsyncSession, user_dict) -> None:
+    dao = UserDAO(db_session)
+    created = await dao.create(user_dict())
+    old_login = created.login
+    new_login = f"user_{uuid4().hex}@example.com"
+
+    await dao.update(created.id, {"login": new_login})
+    assert await _login_owner(db_session, old_login) is None
+    assert await _login_owner(db_session, new_login) == created.id
+
+    # Moving to another project moves the row to another partition.
+    moved = await dao.update(created.id, {"project_id": uuid4()})
+    assert moved.login == new_login
+    assert await _login_owner(db_session, new_login) == created.id
+
+    await dao.delete(created.id)
+    assert await _login_owner(db_session, new_login) is None
+    assert await dao.create(user_dict(new_login)) is not None
+
+
+@pytest.mark.asyncio
+async def test_create_skipping_duplicates_reserves_logins(
+    db_session: AsyncSession, user_dict
+) -> None:
+    dao = UserDAO(db_session)
+    existing = await dao.create(user_dict())
+    fresh = f"user_{uuid4().hex}@example.com"
+
+    created = await dao.create_skipping_duplicates(
+        [user_dict(fresh), user_dict(existing.login), user_dict(fresh)]
+    )
+
+    assert created == [fresh]
+    assert len(await dao.find_all(login=fresh)) == 1
+    assert await _login_owner(db_session, existing.login) == existing.id
+
+
+@pytest.mark.asyncio
+async def test_user_id_is_unique_across_partitions(db_session: AsyncSession, user_dict) -> None:
+    dao = UserDAO(db_session)
+    created = await dao.create(user_dict())
+    login, user_id = created.login, created.id
+
+    # With its own login the duplicate collides in user_logins; with the
+    # same login it looks like a reservation and is checked against users.
+    for duplicate_login in (None, login):
+        with pytest.raises(IntegrityError):
+            await dao.create({**user_dict(duplicate_login), "id": user_id})
+        await db_session.rollback()
+
+    assert len(await dao.find_all(id=user_id)) == 1
+    assert await _login_owner(db_session, login) == user_id
@@ -1,9 +1,21 @@
 from datetime import timedelta
 
+import pytest
 from jose import jwt
 
+from app.core import security
 from app.core.config import get_settings
-from app.core.security import get_password_hash, verify_password, create_jwt_token
+from app.core.security import (
+    get_password_hash,
+    verify_password,
+    create_jwt_token,
+    get_password_executor,
+    get_password_hash_async,
+    shutdown_password_executor,
+    verify_password_async,
+    verify_password_cached,
+    verify_access_token,
+)
 
 
 def test_password_hash_and_verify() -> None:
@@ -30,4 +42,74 @@ def test_create_jwt_token_contains_expected_claims() -> None:
     assert decoded["ver"] == "v1"
     assert decoded["type"] == "access"
     assert "exp" in decoded
-    assert "iat" in decoded
\ No newline at end of file
+    assert "iat" in decoded
+
+
+@pytest.mark.asyncio
+async def test_password_hash_and_verify_async() -> None:
+    raw_password = "super-secret"
+    hashed = await get_password_hash_async(raw_password)
+
+    assert hashed != raw_password
+    assert await verify_password_async(raw_password, hashed) is True
+    assert await verify_password_async("wrong-password", hashed) is False
+
+
+@pytest.mark.asyncio
+async def test_password_executor_is_recreated_after_shutdown() -> None:
+    executor = get_password_executor()
+    assert get_password_executor() is executor
+
+    shutdown_password_executor()
+
+    assert get_password_executor() is not executor
+
+
+@pytest.mark.asyncio
+async def test_verify_password_cached_skips_kdf_on_hit(monkeypatch: pytest.MonkeyPatch) -> None:
+    hashed = get_password_hash("super-secret")
+    calls = []
+
+    async def counting_verify(plain_password: str, hashed_password: str) -> bool:
+        calls.append(plain_password)
+        return verify_password(plain_password, hashed_password)
+
+    monkeypatch.setattr(security, "verify_password_async", counting_verify)
+
+    assert await verify_password_cached("bot@example.com", "super-secret", hashed) is True
+    assert await verify_password_cached("bot@example.com", "super-secret", hashed) is True
+    assert len(calls) == 1
+
+    assert await verify_password_cached("bot@example.com", "wrong-password", hashed) is False
+    assert await verify_password_cached("bot@example.com", "wrong-password", hashed) is False
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_verify_password_cached_misses_after_hash_change() -> None:
+    old_hash = get_password_hash("super-secret")
+    assert await verify_password_cached("bot@example.com", "super-secret", old_hash) is True
+
+    new_hash = get_password_hash("another-secret")
+
+    assert await verify_password_cached("bot@example.com", "super-secret", new_hash) is False
+
+
+def test_verify_access_token_caches_decoded_claims(monkeypatch: pytest.MonkeyPatch) -> None:
+    token = create_jwt_token(
+        data={"sub": "cached-user"},
+        expires_delta=timedelta(minutes=5),
+        token_type="access",
+    )
+    decode = jwt.decode
+    calls = []
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+
+    assert verify_access_token(token)["sub"] == "cached-user"
+    assert verify_access_token(token)["sub"] == "cached-user"
+    assert calls == [token]
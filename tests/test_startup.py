@@ -0,0 +1,44 @@
+import httpx
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import get_async_db_url
+from app.core.database import InstrumentedQueuePool, create_session_maker, get_pool_stats
+from app.main import app
+from app.services.pool_warmup import warm_up_pool
+
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_pool_connections() -> None:
+    engine = create_async_engine(
+        get_async_db_url(),
+        poolclass=InstrumentedQueuePool,
+        pool_size=3,
+        max_overflow=0,
+    )
+    try:
+        await warm_up_pool(create_session_maker(engine), 3)
+        stats = get_pool_stats(engine)
+    finally:
+        await engine.dispose()
+
+    assert stats["checked_in"] == 3
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 3
+
+
+@pytest.mark.asyncio
+async def test_health_reports_readiness() -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        app.state.ready = False
+        starting = await client.get("/health")
+        app.state.ready = True
+        try:
+            ready = await client.get("/health")
+        finally:
+            app.state.ready = False
+
+    assert starting.status_code == 503
+    assert ready.status_code == 200
+    assert ready.json() == {"status": "ready"}
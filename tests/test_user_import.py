@@ -0,0 +1,85 @@
+import json
+from typing import AsyncIterator
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.user_dao import UserDAO
+from app.services.user_import import (
+    DUPLICATE_LOGIN_DETAIL,
+    import_user_rows,
+    iter_lines,
+    parse_user_rows,
+)
+
+
+async def _aiter(items) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+def _user_line(login: str, project_id) -> str:
+    return json.dumps(
+        {
+            "login": login,
+            "password": "secret-password",
+            "project_id": str(project_id),
+            "env": "stage",
+            "domain": "regular",
+        }
+    )
+
+
+@pytest.mark.asyncio
+async def test_iter_lines_joins_split_chunks() -> None:
+    chunks = [b"first\nsec", b"ond\n", "thi".encode(), "rd ✓".encode()[:-1], "✓".encode()[-1:]]
+
+    lines = [line async for line in iter_lines(_aiter(chunks))]
+
+    assert lines == ["first", "second", "third ✓"]
+
+
+@pytest.mark.asyncio
+async def test_import_jsonl_reports_duplicates_and_invalid_rows(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    logins = [f"user_{uuid4().hex}@example.com" for _ in range(3)]
+    lines = [
+        _user_line(logins[0], project_id),
+        _user_line(logins[1], project_id),
+        _user_line(logins[0], project_id),
+        "{not json",
+        _user_line(logins[2], project_id),
+    ]
+
+    result = await import_user_rows(
+        db_session, parse_user_rows(_aiter(lines), "jsonl"), chunk_size=2
+    )
+
+    assert result.created == 3
+    assert [(error.row, error.detail) for error in result.errors if error.login] == [
+        (3, DUPLICATE_LOGIN_DETAIL)
+    ]
+    assert [error.row for error in result.errors if error.login is None] == [4]
+
+    users = await UserDAO(db_session).find_all(project_id=project_id)
+    assert sorted(user.login for user in users) == sorted(logins)
+    assert all(user.password != "secret-password" for user in users)
+
+
+@pytest.mark.asyncio
+async def test_import_csv_skips_existing_logins(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    login = f"user_{uuid4().hex}@example.com"
+    lines = [
+        "login,password,project_id,env,domain",
+        f"{login},secret-password,{project_id},stage,regular",
+    ]
+
+    first = await import_user_rows(db_session, parse_user_rows(_aiter(lines), "csv"), 100)
+    second = await import_user_rows(db_session, parse_user_rows(_aiter(lines), "csv"), 100)
+
+    assert first.created == 1
+    assert first.errors == []
+    assert second.created == 0
+    assert [(error.row, error.login) for error in second.errors] == [(2, login)]
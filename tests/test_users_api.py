@@ -1,26 +1,59 @@
-from uuid import uuid4
+import asyncio
+import json
+from uuid import UUID, uuid4
 
+import httpx
 import pytest
 from fastapi import HTTPException, status
-from sqlalchemy.ext.asyncio import AsyncSession
-
-from app.api.v1.users import create_user, get_users, acquire_lock, release_lock
-from app.schemas.user import UserCreate
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.api.deps import current_project
+from app.api.v1.users import (
+    create_user,
+    get_users,
+    acquire_lock,
+    release_lock,
+    claim_user,
+    claim_users,
+    acquire_locks,
+    release_locks,
+    renew_lock,
+    export_users,
+)
+from app.schemas.user import (
+    UserClaimBatch,
+    UserCreate,
+    UserExportQuery,
+    UserClaimQuery,
+    UserIds,
+    UserPage,
+    UserPageQuery,
+    UserRead,
+)
+from app.main import app
+from app.services.lock_backends import MemoryLockBackend
 from app.services.user_dao import UserDAO
 
 
-def _make_user_create(login: str | None = None) -> UserCreate:
+def _make_user_create(
+    login: str | None = None, project_id: UUID | None = None
+) -> UserCreate:
     if login is None:
         login = f"user_{uuid4().hex}@example.com"
     return UserCreate(
         login=login,
         password="secret-password",
-        project_id=uuid4(),
+        project_id=project_id or uuid4(),
         env="stage",
         domain="regular",
     )
 
 
+async def _get_users_page(query: UserPageQuery, db: AsyncSession) -> UserPage:
+    response = await get_users(query, db=db)
+    return UserPage.model_validate_json(response.body)
+
+
 @pytest.mark.asyncio
 async def test_create_user_success(db_session: AsyncSession) -> None:
     user_in = _make_user_create()
@@ -49,10 +82,72 @@ async def test_get_users_returns_created_user(db_session: AsyncSession) -> None:
     user_in = _make_user_create()
     created = await create_user(user_in, db=db_session)
 
-    users = await get_users(db=db_session)
-    logins = [u.login for u in users]
+    page = await _get_users_page(UserPageQuery(project_id=user_in.project_id), db=db_session)
+
+    assert page.items == [UserRead.model_validate(created)]
+    assert page.next_cursor is None
+
+
+@pytest.mark.asyncio
+async def test_get_users_paginates_with_cursor(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    created_ids = set()
+    for _ in range(5):
+        created = await create_user(_make_user_create(project_id=project_id), db=db_session)
+        created_ids.add(created.id)
+
+    seen_ids = []
+    cursor = None
+    while True:
+        page = await _get_users_page(
+            UserPageQuery(project_id=project_id, limit=2, cursor=cursor), db=db_session
+        )
+        seen_ids.extend(u.id for u in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+
+    assert len(seen_ids) == 5
+    assert set(seen_ids) == created_ids
+
+
+@pytest.mark.asyncio
+async def test_get_users_filters_by_lock_state(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    locked = await create_user(_make_user_create(project_id=project_id), db=db_session)
+    free = await create_user(_make_user_create(project_id=project_id), db=db_session)
+    await acquire_lock(locked.id, db=db_session)
+
+    locked_page = await _get_users_page(
+        UserPageQuery(project_id=project_id, locked=True), db=db_session
+    )
+    free_page = await _get_users_page(
+        UserPageQuery(project_id=project_id, locked=False), db=db_session
+    )
+
+    assert [u.id for u in locked_page.items] == [locked.id]
+    assert [u.id for u in free_page.items] == [free.id]
+
+
+@pytest.mark.asyncio
+async def test_get_users_refuses_lock_filter_without_locktime_backend(
+    db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    backend = MemoryLockBackend(claim_scan_limit=1000)
+    monkeypatch.setattr("app.api.v1.users.get_lock_backend", lambda: backend)
+
+    with pytest.raises(HTTPException) as exc:
+        await _get_users_page(UserPageQuery(locked=True), db=db_session)
+
+    assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.asyncio
+async def test_get_users_invalid_cursor(db_session: AsyncSession) -> None:
+    with pytest.raises(HTTPException) as exc:
+        await get_users(UserPageQuery(cursor="not-a-cursor"), db=db_session)
 
-    assert created.login in logins
+    assert exc.value.status_code == status.HTTP_400_BAD_REQUEST
 
 
 @pytest.mark.asyncio
@@ -93,7 +188,7 @@ async def test_acquire_lock_returns_none_raises_409(db_session: AsyncSession, mo
     user_in = _make_user_create()
     created = await create_user(user_in, db=db_session)
 
-    async def fake_acquire_lock(self, user_id):  # type: ignore[override]
+    async def fake_acquire_lock(self, user_id, lessee=None, project_id=None):  # type: ignore[override]
         return None
 
     monkeypatch.setattr(UserDAO, "acquire_lock", fake_acquire_lock)
@@ -126,11 +221,11 @@ async def test_release_lock_user_not_found(db_session: AsyncSession) -> None:
 
 
 @pytest.mark.asyncio
-async def test_release_lock_returns_none_raises_404(db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch) -> None:
+async def test_release_lock_returns_none_raises_409(db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch) -> None:
     user_in = _make_user_create()
     created = await create_user(user_in, db=db_session)
 
-    async def fake_release_lock(self, user_id):  # type: ignore[override]
+    async def fake_release_lock(self, user_id, project_id=None, lessee=None):  # type: ignore[override]
         return None
 
     monkeypatch.setattr(UserDAO, "release_lock", fake_release_lock)
@@ -138,4 +233,254 @@ async def test_release_lock_returns_none_raises_404(db_session: AsyncSession, mo
     with pytest.raises(HTTPException) as exc:
         await release_lock(created.id, db=db_session)
 
-    assert exc.value.status_code == status.HTTP_404_NOT_FOUND
\ No newline at end of file
+    assert exc.value.status_code == status.HTTP_409_CONFLICT
+    assert exc.value.detail == "User is not locked"
+
+
+@pytest.mark.asyncio
+async def test_release_of_free_user_conflicts(db_session: AsyncSession) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+
+    with pytest.raises(HTTPException) as exc:
+        await release_lock(created.id, db=db_session)
+    released = await release_locks(UserIds(ids=[created.id]), db=db_session)
+
+    assert exc.value.status_code == status.HTTP_409_CONFLICT
+    assert exc.value.detail == "User is not locked"
+    assert released.users == []
+    assert released.failed == [created.id]
+
+
+@pytest.mark.asyncio
+async def test_release_and_renew_without_a_lease_here_conflict(
+    db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+    backend = MemoryLockBackend(claim_scan_limit=1000)
+    monkeypatch.setattr("app.api.v1.users.get_lock_backend", lambda: backend)
+
+    for route in (release_lock, renew_lock):
+        with pytest.raises(HTTPException) as exc:
+            await route(created.id, db=db_session)
+        assert exc.value.status_code == status.HTTP_409_CONFLICT
+        assert exc.value.detail == "User is not locked by this worker"
+
+
+@pytest.mark.asyncio
+async def test_claim_user_success(db_session: AsyncSession) -> None:
+    user_in = _make_user_create()
+    created = await create_user(user_in, db=db_session)
+
+    filters = UserClaimQuery(project_id=user_in.project_id, env="stage", domain="regular")
+    claimed = await claim_user(filters, db=db_session)
+
+    assert claimed.id == created.id
+    assert claimed.locktime is not None
+
+
+@pytest.mark.asyncio
+async def test_claim_user_no_free_user(db_session: AsyncSession) -> None:
+    user_in = _make_user_create()
+    await create_user(user_in, db=db_session)
+
+    filters = UserClaimQuery(project_id=user_in.project_id)
+    await claim_user(filters, db=db_session)
+
+    with pytest.raises(HTTPException) as exc:
+        await claim_user(filters, db=db_session)
+
+    assert exc.value.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.asyncio
+async def test_claim_user_concurrent_claims_are_distinct(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    project_id = uuid4()
+    for _ in range(5):
+        await create_user(_make_user_create(project_id=project_id), db=db_session)
+
+    async def claim() -> UUID | None:
+        async with session_maker() as session:
+            try:
+                user = await claim_user(UserClaimQuery(project_id=project_id), db=session)
+            except HTTPException:
+                return None
+            return user.id
+
+    claimed = await asyncio.gather(*(claim() for _ in range(8)))
+    claimed_ids = [user_id for user_id in claimed if user_id is not None]
+
+    assert len(claimed_ids) == 5
+    assert len(set(claimed_ids)) == 5
+
+
+@pytest.mark.asyncio
+async def test_claim_users_batch_partial(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    for _ in range(3):
+        await create_user(_make_user_create(project_id=project_id), db=db_session)
+
+    result = await claim_users(
+        UserClaimBatch(project_id=project_id, count=5), db=db_session
+    )
+
+    assert result.requested == 5
+    assert len(result.users) == 3
+    assert all(user.locktime is not None for user in result.users)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claim_batches_stay_within_count(
+    db_session: AsyncSession, session_maker: async_sessionmaker[AsyncSession]
+) -> None:
+    project_id = uuid4()
+    for _ in range(20):
+        await create_user(_make_user_create(project_id=project_id), db=db_session)
+
+    async def claim() -> list[UUID]:
+        async with session_maker() as session:
+            result = await claim_users(
+                UserClaimBatch(project_id=project_id, count=3), db=session
+            )
+            return [user.id for user in result.users]
+
+    batches = await asyncio.gather(*(claim() for _ in range(6)))
+    claimed_ids = [user_id for batch in batches for user_id in batch]
+
+    assert all(len(batch) <= 3 for batch in batches)
+    assert len(claimed_ids) == len(set(claimed_ids))
+
+
+@pytest.mark.asyncio
+async def test_acquire_and_release_locks_batch(db_session: AsyncSession) -> None:
+    first = await create_user(_make_user_create(), db=db_session)
+    second = await create_user(_make_user_create(), db=db_session)
+    await acquire_lock(second.id, db=db_session)
+    missing_id = uuid4()
+
+    acquired = await acquire_locks(
+        UserIds(ids=[first.id, second.id, missing_id]), db=db_session
+    )
+
+    assert [user.id for user in acquired.users] == [first.id]
+    assert set(acquired.failed) == {second.id, missing_id}
+
+    released = await release_locks(
+        UserIds(ids=[first.id, second.id, missing_id]), db=db_session
+    )
+
+    assert {user.id for user in released.users} == {first.id, second.id}
+    assert all(user.locktime is None for user in released.users)
+    assert released.failed == [missing_id]
+
+
+@pytest.mark.asyncio
+async def test_renew_lock_success(db_session: AsyncSession) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+    locked = await acquire_lock(created.id, db=db_session)
+
+    renewed = await renew_lock(created.id, db=db_session)
+
+    assert renewed.locktime is not None
+    assert renewed.locktime >= locked.locktime
+
+
+@pytest.mark.asyncio
+async def test_renew_lock_not_locked_raises_409(db_session: AsyncSession) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+
+    with pytest.raises(HTTPException) as exc:
+        await renew_lock(created.id, db=db_session)
+
+    assert exc.value.status_code == status.HTTP_409_CONFLICT
+
+
+@pytest.mark.asyncio
+async def test_renew_lock_user_not_found(db_session: AsyncSession) -> None:
+    with pytest.raises(HTTPException) as exc:
+        await renew_lock(uuid4(), db=db_session)
+
+    assert exc.value.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_lock_routes_look_users_up_in_the_given_project(
+    db_session: AsyncSession,
+) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+
+    for route in (acquire_lock, release_lock, renew_lock):
+        with pytest.raises(HTTPException) as exc:
+            await route(created.id, project_id=uuid4(), db=db_session)
+        assert exc.value.status_code == status.HTTP_404_NOT_FOUND
+
+    project_id = created.project_id
+    assert (await acquire_lock(created.id, project_id=project_id, db=db_session)).locktime
+    assert (await renew_lock(created.id, project_id=project_id, db=db_session)).locktime
+    released = await release_lock(created.id, project_id=project_id, db=db_session)
+
+    assert released.locktime is None
+
+
+@pytest.mark.asyncio
+async def test_release_and_renew_are_limited_to_the_lease_holder(
+    db_session: AsyncSession,
+) -> None:
+    created = await create_user(_make_user_create(), db=db_session)
+    holder, other = uuid4(), uuid4()
+    token = current_project.set(holder)
+    try:
+        await acquire_lock(created.id, db=db_session)
+
+        current_project.set(other)
+        for route in (release_lock, renew_lock):
+            with pytest.raises(HTTPException) as exc:
+                await route(created.id, db=db_session)
+            assert exc.value.status_code == status.HTTP_403_FORBIDDEN
+        released = await release_locks(UserIds(ids=[created.id]), db=db_session)
+        assert released.failed == [created.id]
+        assert await UserDAO(db_session).renew_lock(created.id, lessee=other) is None
+
+        current_project.set(holder)
+        assert (await release_lock(created.id, db=db_session)).locktime is None
+    finally:
+        current_project.reset(token)
+
+
+@pytest.mark.asyncio
+async def test_export_users_streams_ndjson(db_session: AsyncSession) -> None:
+    project_id = uuid4()
+    created_ids = set()
+    for _ in range(3):
+        created = await create_user(_make_user_create(project_id=project_id), db=db_session)
+        created_ids.add(str(created.id))
+
+    response = await export_users(
+        UserExportQuery(project_id=project_id, yield_per=2), db=db_session
+    )
+    chunks = [chunk async for chunk in response.body_iterator]
+    rows = [json.loads(line) for line in b"".join(chunks).decode().splitlines()]
+
+    assert response.media_type == "application/x-ndjson"
+    assert len(chunks) == 2
+    assert {row["id"] for row in rows} == created_ids
+    assert all("password" not in row for row in rows)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cookies", [{}, {"access_token": "not-a-token"}])
+@pytest.mark.parametrize(
+    ("method", "path"),
+    [("GET", "/api/v1/users/"), ("POST", f"/api/v1/users/{uuid4()}/acquire-lock")],
+)
+async def test_users_routes_require_valid_token(
+    cookies: dict[str, str], method: str, path: str
+) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://test", cookies=cookies
+    ) as client:
+        response = await client.request(method, path)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED